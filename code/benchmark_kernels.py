@@ -0,0 +1,90 @@
+"""
+Times the hot paths with and without the numba kernels (see kernels.py) and
+checks that both give the same answer:
+
+    python benchmark_kernels.py [nplanets] [nstars]
+
+By default 10^7 planets on 10^6 stars, observed as in the SNE schedule.
+"""
+import sys
+import time
+
+import numpy as np
+
+import kernels
+from coverage_map import pointing_coverage
+from get_time_on_silicon import StarIndex
+from sector_coverage import SectorCoverage
+from make_catalog import get_camera_coords, get_unique_pointings, get_timeline
+import simfuncs
+
+FIELDFILE = '../data/camera_boresights_SNE.csv'
+
+
+def timed(func, *args, **kwargs):
+    """
+    func(*args, **kwargs) with the kernels, if numba is installed, and with
+    numpy, returning the results and run times by whether the kernels ran
+    """
+    out = {}
+    for jit in ((True, False) if kernels.numba is not None else (False,)):
+        kernels.use_jit = jit
+        start = time.time()
+        out[jit] = (func(*args, **kwargs), time.time() - start)
+    kernels.use_jit = kernels.numba is not None
+    return out
+
+
+if __name__ == '__main__':
+
+    nplanets = int(float(sys.argv[1])) if len(sys.argv) > 1 else 10**7
+    nstars = int(float(sys.argv[2])) if len(sys.argv) > 2 else 10**6
+    if kernels.numba is None:
+        print('numba is not installed: timing numpy only')
+    else:
+        print('numba {}, {} threads'.format(kernels.numba.__version__,
+                                            kernels.numba.get_num_threads()))
+
+    rng = np.random.default_rng(42)
+    elon = rng.uniform(0, 360, nstars)
+    elat = np.degrees(np.arcsin(rng.uniform(-1, 1, nstars)))
+    camdf = get_camera_coords(FIELDFILE)
+    pointings = get_unique_pointings(camdf)
+    index = StarIndex(elon, elat)
+
+    # compile outside the timings
+    pointing_coverage(elon[:1000], elat[:1000], pointings[:1],
+                      camdf['pointing'].values[:1])
+    simfuncs.count_transits(np.zeros(10), np.ones(10),
+                            np.ones((10, 1), dtype=bool))
+    simfuncs.count_transits_matrix(np.ones((10, 1), dtype=np.uint8),
+                                   SectorCoverage.from_dense(np.ones((10, 1))))
+
+    out = timed(pointing_coverage, elon, elat, pointings,
+                camdf['pointing'].values, index=index)
+    print('on silicon, {} stars: {:.2f} s numpy'.format(nstars, out[False][1]))
+    if True in out:
+        print('    {:.2f} s numba, same: {}'.format(
+            out[True][1], np.array_equal(out[True][0].words, out[False][0].words)))
+    coverage = out[False][0]
+
+    host = rng.integers(0, nstars, nplanets)
+    period = np.exp(rng.uniform(np.log(0.5), np.log(500.), nplanets))
+    T0 = rng.uniform(0, 1, nplanets) * period
+    planet_coverage = coverage.take(host)
+    timeline = get_timeline(FIELDFILE)
+    out = timed(simfuncs.count_transits, T0, period, planet_coverage,
+                timeline=timeline)
+    print('transits, {} planets: {:.2f} s numpy'.format(nplanets, out[False][1]))
+    if True in out:
+        print('    {:.2f} s numba, same: {}'.format(
+            out[True][1], np.array_equal(out[True][0], out[False][0])))
+
+    transits = simfuncs.transit_matrix(T0, period, len(timeline),
+                                       timeline=timeline)
+    out = timed(simfuncs.count_transits_matrix, transits, planet_coverage)
+    print('transit matrix, {} planets: {:.2f} s numpy'.format(nplanets,
+                                                            out[False][1]))
+    if True in out:
+        print('    {:.2f} s numba, same: {}'.format(
+            out[True][1], np.array_equal(out[True][0], out[False][0])))
@@ -0,0 +1,244 @@
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+try:
+    import healpy as hp
+except ImportError:
+    hp = None
+
+import kernels
+from sector_coverage import SectorCoverage, atomic_save
+from get_time_on_silicon import (StarIndex, CameraFootprint, FOV_DEG, CCD_PIX,
+                                 GAP_PIX)
+
+
+def pointing_coverage(elon, elat, pointings, sector_pointing, margin=0.,
+                      index=None, nworkers=1):
+    """
+    SectorCoverage of the stars at ecliptic (elon, elat), given the distinct
+    camera pointings (each a list of four (elat, elon) camera centres, as
+    from get_unique_pointings) and the pointing each sector uses. Each
+    pointing is projected once, each camera only onto the stars near it,
+    and cameras at the same latitude share one CameraFootprint. margin is
+    passed on to onchip_test; index is a StarIndex of the stars, if there is
+    one already. With nworkers other than 1 (None for one per CPU) the
+    stars are split into shards computed in a process pool, see
+    parallel_pointing_coverage.
+    """
+    if nworkers != 1:
+        return parallel_pointing_coverage(elon, elat, pointings,
+                                          sector_pointing, margin=margin,
+                                          nworkers=nworkers)
+    elon = np.asarray(elon, dtype=float)
+    elat = np.asarray(elat, dtype=float)
+    sector_pointing = np.asarray(sector_pointing)
+    if index is None:
+        index = StarIndex(elon, elat)
+    nsectors = len(sector_pointing)
+    words = np.zeros((len(elon), SectorCoverage.nwords(nsectors)), dtype='<u8')
+    footprints = {}
+    for lat in sorted(set(lat for pointing in pointings for lat, lon in pointing)):
+        footprints[lat] = CameraFootprint(lat, margin=margin)
+    for n_pointing, pointing in enumerate(pointings):
+        # cameras can overlap at the edges of their fields
+        onsilicon = np.unique(np.concatenate(
+            [footprints[lat].on_silicon(index, lon) for lat, lon in pointing]))
+        for k in np.flatnonzero(sector_pointing == n_pointing):
+            words[onsilicon, k // 64] |= np.uint64(1) << np.uint64(k % 64)
+    return SectorCoverage(words, nsectors)
+
+
+def _shared_array(shape, dtype):
+    shm = shared_memory.SharedMemory(
+        create=True, size=max(int(np.prod(shape))*np.dtype(dtype).itemsize, 1))
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def _shard_coverage(task):
+    """
+    worker for parallel_pointing_coverage: coverage of stars start:stop,
+    read from and written to the shared arrays named in task
+    """
+    (elon_name, elat_name, words_name, nstars, nwords, start, stop,
+     pointings, sector_pointing, margin) = task
+    kernels.limit_worker_threads()
+    blocks = [shared_memory.SharedMemory(name=name)
+              for name in (elon_name, elat_name, words_name)]
+    try:
+        elon = np.ndarray((nstars,), dtype=float, buffer=blocks[0].buf)
+        elat = np.ndarray((nstars,), dtype=float, buffer=blocks[1].buf)
+        words = np.ndarray((nstars, nwords), dtype='<u8', buffer=blocks[2].buf)
+        words[start:stop] = pointing_coverage(
+            elon[start:stop], elat[start:stop], pointings, sector_pointing,
+            margin=margin).words
+        del elon, elat, words
+    finally:
+        for block in blocks:
+            block.close()
+    return stop - start
+
+
+def parallel_pointing_coverage(elon, elat, pointings, sector_pointing,
+                               margin=0., nworkers=None, shardsize=250000):
+    """
+    pointing_coverage in a pool of nworkers processes (None for one per
+    CPU), shardsize stars at a time. The star coordinates are shared with
+    the workers, and the workers write their shards into a shared output
+    array, so nothing bigger than a list of pointings is pickled. Every
+    star's coverage is computed independently, so the result is identical
+    to the serial one.
+    """
+    elon = np.asarray(elon, dtype=float)
+    elat = np.asarray(elat, dtype=float)
+    sector_pointing = np.asarray(sector_pointing)
+    nstars = len(elon)
+    nsectors = len(sector_pointing)
+    nwords = SectorCoverage.nwords(nsectors)
+    if nworkers is None:
+        nworkers = os.cpu_count()
+
+    blocks = []
+    try:
+        for data in (elon, elat):
+            shm, arr = _shared_array((nstars,), float)
+            arr[:] = data
+            blocks.append(shm)
+        shm, words = _shared_array((nstars, nwords), '<u8')
+        words[:] = 0
+        blocks.append(shm)
+        tasks = [(blocks[0].name, blocks[1].name, blocks[2].name, nstars,
+                  nwords, start, min(start + shardsize, nstars), pointings,
+                  sector_pointing, margin)
+                 for start in range(0, nstars, shardsize)]
+        with ProcessPoolExecutor(max_workers=nworkers,
+                                 mp_context=kernels.pool_context()) as pool:
+            for _ in pool.map(_shard_coverage, tasks):
+                pass
+        result = SectorCoverage(words.copy(), nsectors)
+        del arr, words
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+    return result
+
+
+def _require_healpy():
+    if hp is None:
+        raise ImportError("HEALPix coverage maps need healpy "
+                          "(pip install healpy)")
+
+
+class HealpixCoverageMap(object):
+    """
+    Sectors each pixel of a HEALPix map (RING ordering, ecliptic
+    coordinates) is observed in, for one boresight strategy, and whether a
+    CCD edge or chip gap crosses the pixel in any pointing.
+
+    Outside flagged pixels every point of a pixel is observed in the same
+    sectors, so a star's coverage is just its pixel's. In flagged pixels it
+    has to be worked out star by star (see star_coverage); their words hold
+    only the sectors in which the whole pixel is on silicon.
+    """
+
+    def __init__(self, nside, words, edge, nsectors):
+        self.nside = nside
+        self.coverage = SectorCoverage(words, nsectors)
+        self.edge = np.asarray(edge, dtype=bool)
+
+    @classmethod
+    def build(cls, pointings, sector_pointing, nside=1024, nworkers=1):
+        """
+        make the map by projecting every pixel centre, once requiring and
+        once not requiring the pixel's whole extent to be on silicon; where
+        the two differ an edge crosses the pixel. nworkers is passed to
+        pointing_coverage.
+        """
+        _require_healpy()
+        elon, elat = hp.pix2ang(nside, np.arange(hp.nside2npix(nside)),
+                                lonlat=True)
+        index = StarIndex(elon, elat) if nworkers == 1 else None
+        # pixel radius in CCD pixels, with room for the TAN projection
+        # stretching up to ~10% towards the corners of the field
+        deg_per_pix = FOV_DEG/(CCD_PIX + GAP_PIX)
+        margin = 1.2*np.degrees(hp.max_pixrad(nside))/deg_per_pix
+        inner = pointing_coverage(elon, elat, pointings, sector_pointing,
+                                  margin=margin, index=index,
+                                  nworkers=nworkers)
+        outer = pointing_coverage(elon, elat, pointings, sector_pointing,
+                                  margin=-margin, index=index,
+                                  nworkers=nworkers)
+        edge = (inner.words != outer.words).any(axis=1)
+        return cls(nside, inner.words, edge, inner.nsectors)
+
+    def nobserved(self):
+        """
+        number of sectors each pixel is observed in, e.g. for hp.mollview
+        """
+        return self.coverage.count()
+
+    def lookup(self, elon, elat):
+        """
+        SectorCoverage of the pixels holding the stars at (elon, elat), and
+        which of those pixels are flagged as crossed by an edge
+        """
+        _require_healpy()
+        pix = hp.ang2pix(self.nside, elon, elat, lonlat=True)
+        return self.coverage.take(pix), self.edge[pix]
+
+    def star_coverage(self, elon, elat, pointings, sector_pointing,
+                      nworkers=1):
+        """
+        SectorCoverage of the stars at (elon, elat): a lookup, except for the
+        stars in flagged pixels, which are projected exactly (in nworkers
+        processes, see pointing_coverage)
+        """
+        elon = np.asarray(elon, dtype=float)
+        elat = np.asarray(elat, dtype=float)
+        coverage, edge = self.lookup(elon, elat)
+        refine = np.flatnonzero(edge)
+        if len(refine):
+            coverage.words[refine] = pointing_coverage(
+                elon[refine], elat[refine], pointings, sector_pointing,
+                nworkers=nworkers).words
+        return coverage
+
+    def save(self, fn):
+        atomic_save(fn, lambda f: np.savez(
+            f, nside=self.nside, words=self.coverage.words, edge=self.edge,
+            nsectors=self.coverage.nsectors))
+
+    @classmethod
+    def load(cls, fn):
+        d = np.load(fn)
+        return cls(int(d['nside']), d['words'], d['edge'], int(d['nsectors']))
+
+
+def map_cache_key(fieldfile, nside):
+    """
+    content hash of the boresight file and the map resolution
+    """
+    h = hashlib.sha1()
+    with open(fieldfile, "rb") as f:
+        h.update(f.read())
+    h.update(str(nside).encode())
+    return h.hexdigest()
+
+
+def cached_coverage_map(cachefile, build):
+    """
+    returns the HealpixCoverageMap saved in cachefile, or if there is no
+    such file calls build() and saves its result there for next time
+    """
+    if os.path.exists(cachefile):
+        return HealpixCoverageMap.load(cachefile)
+    covmap = build()
+    cachedir = os.path.dirname(cachefile)
+    if cachedir and not os.path.isdir(cachedir):
+        os.makedirs(cachedir)
+    covmap.save(cachefile)
+    return covmap
@@ -6,11 +6,359 @@
 from __future__ import division, print_function
 
 import numpy as np, pandas as pd
+from numpy import array as nparr
 
 from astropy import units as u
-from astropy import wcs
 from astropy.coordinates import SkyCoord
 
+import kernels
+
+# ccd info. see e.g., Huang et al, 2018. The gap size is a number inherited
+# from Josh Winn's code.
+FOV_DEG = 24.
+CCD_PIX = 4096.
+GAP_PIX = 2./0.015 # about 133 pixels per gap
+
+
+_ECLIPTIC_ROTATIONS = {}
+
+
+def icrs_to_ecliptic_matrix(frame='barycentrictrueecliptic'):
+    '''
+    Rotation matrix taking ICRS unit vectors to the given ecliptic frame.
+    It is worked out once per frame, by sending the three ICRS axes through
+    astropy, and cached. Any other star then needs only a matrix product.
+    '''
+    if frame not in _ECLIPTIC_ROTATIONS:
+        axes = SkyCoord(ra=[0., 90., 0.]*u.degree, dec=[0., 0., 90.]*u.degree,
+                        frame='icrs').transform_to(frame)
+        # columns are the images of the ICRS x, y and z axes
+        _ECLIPTIC_ROTATIONS[frame] = axes.cartesian.xyz.value
+    return _ECLIPTIC_ROTATIONS[frame]
+
+
+def icrs_to_ecliptic(ra, dec, frame='barycentrictrueecliptic'):
+    '''
+    Ecliptic longitude and latitude in degrees of ICRS ra, dec in degrees
+    (numpy arrays), the same as SkyCoord(ra, dec).barycentrictrueecliptic
+    to ~1e-10 degree but without astropy's frame machinery per call.
+    '''
+    ra = np.radians(np.asarray(ra, dtype=float))
+    dec = np.radians(np.asarray(dec, dtype=float))
+    xyz = np.array([np.cos(dec)*np.cos(ra), np.cos(dec)*np.sin(ra),
+                    np.sin(dec)])
+    ex, ey, ez = np.tensordot(icrs_to_ecliptic_matrix(frame), xyz, axes=1)
+    elon = np.mod(np.degrees(np.arctan2(ey, ex)), 360.)
+    elat = np.degrees(np.arcsin(np.clip(ez, -1., 1.)))
+    return elon, elat
+
+
+def tan_project(elon, elat, view_elon, view_elat, fov=FOV_DEG,
+                ccd_pix=CCD_PIX, gap_pix=GAP_PIX):
+    '''
+    Gnomonic (TAN) projection of stars onto the pixel grid of each camera
+    view, in pure numpy. Equivalent to building a WCS per view with
+    CRPIX = ccd center, CRVAL = (view_elon, view_elat), CDELT = degrees per
+    pixel, CTYPE = RA---TAN/DEC--TAN and calling wcs_world2pix(elon, elat, 1),
+    as get_time_on_silicon does, but for all views at once.
+
+    Args:
+        elon, elat (np.ndarray): star ecliptic coordinates in degrees, (n_stars,)
+        view_elon, view_elat (np.ndarray): view centres in degrees, (n_views,)
+
+    Returns:
+        x, y (np.ndarray): 1-based pixel coordinates, (n_stars, n_views). Stars
+        90 degrees or more from a view centre are nan.
+    '''
+    ccd_center = (ccd_pix + gap_pix) / 2
+    deg_per_pix = fov / (ccd_pix + gap_pix)
+
+    lam = np.radians(np.asarray(elon, dtype=float))[:, None]
+    bet = np.radians(np.asarray(elat, dtype=float))[:, None]
+    lam0 = np.radians(np.asarray(view_elon, dtype=float))[None, :]
+    bet0 = np.radians(np.asarray(view_elat, dtype=float))[None, :]
+
+    cosb, sinb = np.cos(bet), np.sin(bet)
+    cosb0, sinb0 = np.cos(bet0), np.sin(bet0)
+    dlam = lam - lam0
+    cosdlam = np.cos(dlam)
+
+    # cosine of the angular distance from the view centre
+    cosc = sinb0*sinb + cosb0*cosb*cosdlam
+    # WCS defaults LONPOLE to 180 deg, except for a view centred on the +90
+    # pole where it is 0 deg, which turns the image through 180 deg
+    scale = np.where(np.asarray(view_elat)[None, :] >= 90., -1., 1.)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scale = scale * np.degrees(1.) / (deg_per_pix * cosc)
+        x = ccd_center + scale*cosb*np.sin(dlam)
+        y = ccd_center + scale*(cosb0*sinb - sinb0*cosb*cosdlam)
+    behind = cosc <= 0
+    x[behind] = np.nan
+    y[behind] = np.nan
+    return x, y
+
+
+def onchip_test(x, y, ccd_pix=CCD_PIX, gap_pix=GAP_PIX, margin=0.):
+    '''
+    Are 1-based pixel coordinates (from tan_project) on one of the four CCDs
+    of a camera, rather than off the edge or in a chip gap? Same test as in
+    get_time_on_silicon: the extra "1" is because of 1-based image count.
+
+    A positive margin (in pixels) requires the point to be at least that far
+    inside a CCD; a negative one accepts points up to that far outside.
+    '''
+    lower = (ccd_pix - gap_pix)/2. - 1.
+    upper = (ccd_pix + gap_pix)/2. - 1.
+    edge = (ccd_pix + gap_pix) - 1.
+    m = margin
+    onx = ((x > 0.0 + m) & (x < lower - m)) | ((x > upper + m) & (x < edge - m))
+    ony = ((y > 0.0 + m) & (y < lower - m)) | ((y > upper + m) & (y < edge - m))
+    return onx & ony
+
+
+def fov_radius(fov=FOV_DEG):
+    '''
+    Radius in degrees of the cone circumscribing a camera's square field of
+    view, i.e. the angular distance from the view centre to a CCD corner,
+    about 16.5 deg for TESS's 24 deg cameras. Nothing outside it can be on
+    silicon.
+    '''
+    return np.degrees(np.arctan(np.sqrt(2.)*np.radians(fov/2.)))
+
+
+class StarIndex(object):
+    '''
+    Spatial index over star positions, so a camera view only projects the
+    stars near it. Stars are sorted into cellsize-degree bands of ecliptic
+    latitude, and by longitude within each band. A cone around a view
+    centre is then a handful of contiguous runs of the sorted stars (found
+    by binary search), which are cut down exactly with a unit-vector dot
+    product.
+    '''
+
+    def __init__(self, elon, elat, cellsize=1.):
+        elon = np.mod(np.asarray(elon, dtype=float), 360.)
+        elat = np.asarray(elat, dtype=float)
+        self.cellsize = cellsize
+        self.ncells = int(np.ceil(180./cellsize))
+        cell = np.clip(np.floor((elat + 90.)/cellsize).astype(int), 0,
+                       self.ncells - 1)
+        # cell*360 + lon increases monotonically through the sort order
+        self.order = np.lexsort((elon, cell))
+        self.key = cell[self.order]*360. + elon[self.order]
+        lam = np.radians(elon[self.order])
+        bet = np.radians(elat[self.order])
+        self.xyz = np.column_stack([np.cos(bet)*np.cos(lam),
+                                    np.cos(bet)*np.sin(lam), np.sin(bet)])
+
+    def __len__(self):
+        return len(self.order)
+
+    def cone_shape(self, view_elat, radius):
+        '''
+        latitude cells a cone of radius degrees centred at latitude view_elat
+        touches, and its longitude half-width (None if it holds a pole).
+        These don't depend on the cone's longitude.
+        '''
+        lo_cell = int(np.floor((max(view_elat - radius, -90.) + 90.)/self.cellsize))
+        hi_cell = int(np.floor((min(view_elat + radius, 90.) + 90.)/self.cellsize))
+        cells = np.arange(max(lo_cell, 0), min(hi_cell, self.ncells - 1) + 1)
+        if abs(view_elat) + radius >= 90.:
+            return cells, None
+        dlon = np.degrees(np.arcsin(np.sin(np.radians(radius)) /
+                                    np.cos(np.radians(view_elat))))
+        return cells, dlon
+
+    def cone_positions(self, view_elon, centre, cosradius, cells, dlon):
+        '''
+        positions in the index's sort order of the stars within a cone, given
+        its centre as a unit vector, the cosine of its radius and its
+        cone_shape
+        '''
+        if dlon is None:
+            lon_ranges = [(0., 360.)]
+        else:
+            lo = np.mod(view_elon - dlon, 360.)
+            hi = lo + 2*dlon
+            if hi > 360.:
+                lon_ranges = [(lo, 360.), (0., hi - 360.)]
+            else:
+                lon_ranges = [(lo, hi)]
+
+        starts, stops = [], []
+        for lo, hi in lon_ranges:
+            # a range running up to 360 mustn't take in the next band's stars
+            # at longitude 0, which the range starting at 0 already has
+            side = 'left' if hi >= 360. else 'right'
+            starts.append(np.searchsorted(self.key, cells*360. + lo, side='left'))
+            stops.append(np.searchsorted(self.key, cells*360. + hi, side=side))
+        starts = np.concatenate(starts)
+        lengths = np.concatenate(stops) - starts
+        # concatenate the runs starts[i]:starts[i]+lengths[i]
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        candidates = offsets + np.arange(lengths.sum())
+        return candidates[self.xyz[candidates].dot(centre) >= cosradius]
+
+    def cone(self, view_elon, view_elat, radius):
+        '''
+        indices (into the elon/elat the index was built from, in increasing
+        order) of the stars within radius degrees of (view_elon, view_elat)
+        '''
+        lam0, bet0 = np.radians(view_elon), np.radians(view_elat)
+        centre = np.array([np.cos(bet0)*np.cos(lam0),
+                           np.cos(bet0)*np.sin(lam0), np.sin(bet0)])
+        cells, dlon = self.cone_shape(view_elat, radius)
+        pos = self.cone_positions(view_elon, centre, np.cos(np.radians(radius)),
+                                  cells, dlon)
+        return np.sort(self.order[pos])
+
+
+class CameraFootprint(object):
+    '''
+    The on-silicon region of a camera pointed at ecliptic latitude view_elat,
+    in a frame that turns with the camera's longitude.
+
+    Everything that depends only on the latitude (the TAN projection
+    constants and the shape of the circumscribed cone) is worked out once,
+    so the same footprint serves every pointing at that latitude. Placing
+    it at a longitude (on_silicon) turns the stars' unit vectors from a
+    StarIndex about the ecliptic pole by multiply-adds. There is no trig per
+    star, and the pixel coordinates agree with tan_project to ~1e-9 pixel.
+    margin is passed to onchip_test.
+    '''
+
+    def __init__(self, view_elat, fov=FOV_DEG, ccd_pix=CCD_PIX, gap_pix=GAP_PIX,
+                 margin=0.):
+        self.view_elat = view_elat
+        self.ccd_pix = ccd_pix
+        self.gap_pix = gap_pix
+        self.margin = margin
+        deg_per_pix = fov / (ccd_pix + gap_pix)
+        self.ccd_center = (ccd_pix + gap_pix) / 2
+        # pad the cone a little so rounding can't lose a star in a CCD corner
+        self.radius = (fov_radius(fov) + 0.01 +
+                       1.5*max(-margin, 0.)*deg_per_pix)
+        self.cosradius = np.cos(np.radians(self.radius))
+        bet0 = np.radians(view_elat)
+        self.cosb0, self.sinb0 = np.cos(bet0), np.sin(bet0)
+        # see tan_project for the flip at the +90 pole
+        self.scale = (-1. if view_elat >= 90. else 1.)*np.degrees(1.)/deg_per_pix
+        self._shapes = {}
+
+    def on_silicon(self, index, view_elon):
+        '''
+        indices (into the stars index was built from, in increasing order)
+        of the stars on silicon with the camera at longitude view_elon.
+        With numba installed the projection and onchip_test are one
+        compiled kernel (see kernels.footprint_onchip).
+        '''
+        key = (id(index), index.cellsize)
+        if key not in self._shapes:
+            self._shapes[key] = index.cone_shape(self.view_elat, self.radius)
+        cells, dlon = self._shapes[key]
+        lam0 = np.radians(view_elon)
+        cosl0, sinl0 = np.cos(lam0), np.sin(lam0)
+        centre = np.array([self.cosb0*cosl0, self.cosb0*sinl0, self.sinb0])
+        pos = index.cone_positions(view_elon, centre, self.cosradius, cells,
+                                   dlon)
+
+        if kernels.use_jit:
+            on = kernels.footprint_onchip(
+                index.xyz, pos, cosl0, sinl0, self.cosb0, self.sinb0,
+                self.scale, self.ccd_center, self.ccd_pix, self.gap_pix,
+                self.margin)
+            return np.sort(index.order[pos[on]])
+
+        xs, ys, zs = index.xyz[pos].T
+        # cos(b) cos(l - l0) and cos(b) sin(l - l0), by angle addition
+        cosdl = xs*cosl0 + ys*sinl0
+        sindl = ys*cosl0 - xs*sinl0
+        cosc = self.sinb0*zs + self.cosb0*cosdl
+        scale = self.scale/cosc
+        x = self.ccd_center + scale*sindl
+        y = self.ccd_center + scale*(self.cosb0*zs - self.sinb0*cosdl)
+        on = onchip_test(x, y, ccd_pix=self.ccd_pix, gap_pix=self.gap_pix,
+                         margin=self.margin)
+        return np.sort(index.order[pos[on]])
+
+
+def stars_on_silicon(elon, elat, view_elon, view_elat, chunksize=10000,
+                     prefilter=True, fov=FOV_DEG, ccd_pix=CCD_PIX,
+                     gap_pix=GAP_PIX, margin=0.):
+    '''
+    Which stars fall on silicon in which camera views.
+
+    With prefilter, a StarIndex picks out the few percent of stars near each
+    view and only those are placed in the view's CameraFootprint, one per
+    distinct view latitude. Otherwise every star is projected into every
+    view in one vectorized pass, chunksize stars at a time so the (stars x
+    views) temporaries stay bounded. Both give the same answer. fov,
+    ccd_pix and gap_pix describe the cameras as in tan_project, and margin
+    is passed to onchip_test.
+
+    Args:
+        elon, elat (np.ndarray): star ecliptic coordinates in degrees
+        view_elon, view_elat (np.ndarray): camera view centres in degrees
+
+    Returns:
+        onchip (np.ndarray): uint8 (n_stars, n_views), 1 if on silicon.
+    '''
+    elon = np.asarray(elon, dtype=float)
+    elat = np.asarray(elat, dtype=float)
+    view_elon = np.atleast_1d(view_elon)
+    view_elat = np.atleast_1d(view_elat)
+    onchip = np.zeros((len(elon), len(view_elon)), dtype=np.uint8)
+    if prefilter:
+        index = StarIndex(elon, elat)
+        footprints = {}
+        for n_view in range(len(view_elon)):
+            lat = view_elat[n_view]
+            if lat not in footprints:
+                footprints[lat] = CameraFootprint(lat, fov=fov, ccd_pix=ccd_pix,
+                                                  gap_pix=gap_pix, margin=margin)
+            on = footprints[lat].on_silicon(index, view_elon[n_view])
+            onchip[on, n_view] = 1
+        return onchip
+    for start in range(0, len(elon), chunksize):
+        sl = slice(start, start+chunksize)
+        x, y = tan_project(elon[sl], elat[sl], view_elon, view_elat, fov=fov,
+                           ccd_pix=ccd_pix, gap_pix=gap_pix)
+        onchip[sl] = onchip_test(x, y, ccd_pix=ccd_pix, gap_pix=gap_pix,
+                                 margin=margin)
+    return onchip
+
+
+SOUTHERN_CAMERA_ELATS = np.array([-18., -42., -66., -90.])
+
+
+def year_views(lambda_init=315.8, n_sectors=13,
+               camera_elats=SOUTHERN_CAMERA_ELATS):
+    '''
+    ecliptic longitudes and latitudes in degrees of the camera views of one
+    year of TESS's original southern-hemisphere schedule, sector by sector
+    and camera by camera within a sector, as in get_time_on_silicon
+    '''
+    sector_elon = np.mod(lambda_init + np.arange(n_sectors)*(360/n_sectors), 360)
+    view_elon = np.repeat(sector_elon, len(camera_elats))
+    view_elat = np.tile(camera_elats, n_sectors)
+    return view_elon, view_elat
+
+
+def get_sector_cameras(elon, elat, lambda_init=315.8, n_sectors=13):
+    '''
+    Vectorized counterpart to tvguide's TessPointing.get_13cameras: for each
+    star, the number of the camera (1 nearest the ecliptic to 4 on the
+    pole) it falls on in each sector of a southern year, or 0 if none.
+
+    Returns:
+        cameras (np.ndarray): int (n_stars, n_sectors)
+    '''
+    view_elon, view_elat = year_views(lambda_init, n_sectors)
+    onchip = stars_on_silicon(elon, elat, view_elon, view_elat)
+    onchip = onchip.reshape(-1, n_sectors, len(SOUTHERN_CAMERA_ELATS)) != 0
+    return np.where(onchip.any(axis=2), onchip.argmax(axis=2) + 1, 0)
+
+
 def get_time_on_silicon(coords, lambda_init=315.8*u.degree, fov=24.*u.degree,
                         n_sectors=13):
     '''
@@ -19,7 +367,8 @@ def get_time_on_silicon(coords, lambda_init=315.8*u.degree, fov=24.*u.degree,
         b) the total time on TESS silicon each gets
 
     Args:
-        coords: array of astropy coordinates
+        coords: array of astropy coordinates, or a tuple (ra, dec) of numpy
+            arrays of ICRS coordinates in degrees, which skips astropy
 
     Kwargs:
         lambda_init (float): the initial ecliptic longitude for TESS. Retrieved online
@@ -40,17 +389,25 @@ def get_time_on_silicon(coords, lambda_init=315.8*u.degree, fov=24.*u.degree,
         sector. There are 26*4=104 views over the first two years.
     '''
 
-    n_coords = len(coords)
+    if isinstance(coords, SkyCoord):
+        ra, dec = coords.ra.value, coords.dec.value
+        ecl = coords.barycentrictrueecliptic
+        elon, elat = ecl.lon.value, ecl.lat.value
+    else:
+        ra, dec = np.asarray(coords[0], dtype=float), np.asarray(coords[1], dtype=float)
+        elon, elat = icrs_to_ecliptic(ra, dec)
+
+    n_coords = len(ra)
     print('computing sector numbers for {:d} stars/objects'.format(n_coords))
 
     n_cameras = 4 # this will hopefully never change
     n_views = n_sectors*n_cameras
 
     # create dataframe that we will save boolean sector observations in.
-    d = {'ra':coords.ra.value,
-         'dec':coords.dec.value,
-         'elon':coords.barycentrictrueecliptic.lon.value,
-         'elat':coords.barycentrictrueecliptic.lat.value
+    d = {'ra':ra,
+         'dec':dec,
+         'elon':elon,
+         'elat':elat
         }
     df = pd.DataFrame(data=d)
     for sector in range(n_sectors):
@@ -75,68 +432,17 @@ def get_time_on_silicon(coords, lambda_init=315.8*u.degree, fov=24.*u.degree,
     views_columns = ['n_sector', 'n_camera', 'elon', 'elat', 'ra', 'dec']
     views = pd.DataFrame(views, columns=views_columns)
 
-    # ccd info. see e.g., Huang et al, 2018. The gap size is a number inherited
-    # from Josh Winn's code.
-    ccd_pix = 4096*u.pix
-    gap_pix = (2./0.015)*u.pix # about 133 pixels per gap
-    pixel_scale = u.pixel_scale(fov/(ccd_pix + gap_pix))
-    ccd_center = np.ones(2)*(ccd_pix + gap_pix) / 2
-    delt = (np.ones(2)*u.pix).to(u.degree, pixel_scale)
-
-    elon = coords.barycentrictrueecliptic.lon.value
-    elat = coords.barycentrictrueecliptic.lat.value
-    ra = coords.ra.value
-    dec = coords.dec.value
-
-    for ix, view in views.iterrows():
-
-        # create new WCS object. See. e.g., Calabretta & Greisen 2002, paper
-        # II, table 1. CRPIX: pixel-coordinates of reference pixel (center of
-        # image). CRVAL: celestial long (RA) and lat (dec) of reference pixel.
-        # CDELT: degrees per pixel at reference pixel location, i.e. the
-        # coordinate scale. CTYPE: gnomic projection.
-        w = wcs.WCS(naxis=2)
-        w.wcs.crpix = ccd_center.value
-        w.wcs.crval = [view['elon'].value, view['elat'].value]
-        ###w.wcs.crval = [view['ra'].value, view['dec'].value] # either works?
-        w.wcs.cdelt = delt.value
-        w.wcs.ctype = ['RA---TAN', 'DEC--TAN']
-
-        # follow fits standards: The image pixel count starts with 1.
-        x, y = w.wcs_world2pix(elon, elat, 1)
-        ###x, y = w.wcs_world2pix(ra, dec, 1) # either works?
-
-        try:
-            # the extra "1" is because of 1-based image count.
-            onchip = (   # lower left CCD
-                         ((x > 0.0) &
-                         (x < (ccd_pix.value-gap_pix.value)/2.-1.) &
-                         (y > 0.0) &
-                         (y < (ccd_pix.value-gap_pix.value)/2.-1.))
-                     |   # lower right CCD
-                         ((x > (ccd_pix.value+gap_pix.value)/2.-1.) &
-                         (x < (ccd_pix.value+gap_pix.value)-1.) &
-                         (y > 0.0) &
-                         (y < (ccd_pix.value-gap_pix.value)/2.-1.))
-                     |   # upper right CCD
-                         ((x > (ccd_pix.value+gap_pix.value)/2.-1.) &
-                         (x < (ccd_pix.value+gap_pix.value)-1.) &
-                         (y > (ccd_pix.value+gap_pix.value)/2.-1.) &
-                         (y < (ccd_pix.value+gap_pix.value)-1.))
-                     |   # upper left CCD 
-                         ((x > 0.0) &
-                         (x < (ccd_pix.value-gap_pix.value)/2.-1.) &
-                         (y > (ccd_pix.value+gap_pix.value)/2.-1.) &
-                         (y < (ccd_pix.value+gap_pix.value)-1.))
-                     )
-
-        except Exception as e:
-
-            print('failed computing onchip. error msg: {:s}'.format(e))
-            return 0
-
-        # save result to DataFrame
-        df['sector_'+str(views.iloc[ix]['n_sector'])] += onchip.astype(int)
+    # project every star into all the views at once. See tan_project for
+    # the equivalent WCS.
+    view_elon = np.array([v.value for v in views['elon']])
+    view_elat = np.array([v.value for v in views['elat']])
+    onchip = stars_on_silicon(elon, elat, view_elon, view_elat,
+                              fov=fov.to(u.degree).value)
+
+    # save result to DataFrame
+    for n_sector in range(n_sectors):
+        in_sector = nparr(views['n_sector'] == n_sector)
+        df['sector_'+str(n_sector)] = onchip[:, in_sector].sum(axis=1).astype(int)
 
     # compute total sectors observed for each object
     sector_names = ['sector_'+str(ix) for ix in range(n_sector)]
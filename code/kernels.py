@@ -0,0 +1,193 @@
+import multiprocessing
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# whether the compiled kernels are used; without numba, or with this set to
+# False, callers take their numpy paths
+use_jit = numba is not None
+
+# whether the kernels run on numba's thread pool, see set_num_threads
+parallel = True
+
+
+def set_num_threads(nthreads):
+    """
+    number of threads the kernels run on, e.g. 1 in the workers of a
+    process pool that is already one per CPU.
+
+    With one thread the serial builds of the kernels run, which never start
+    numba's threading layer. The pools in this package fork, possibly after
+    the parallel kernels have run in the parent, and a tbb or OpenMP thread
+    pool inherited that way hangs or aborts the child if it is used.
+    """
+    global parallel
+    parallel = nthreads > 1
+    if numba is not None and parallel:
+        numba.set_num_threads(min(nthreads, numba.config.NUMBA_NUM_THREADS))
+
+
+def pool_context():
+    """
+    multiprocessing context for the process pools in this package: fork
+    where there is one, so workers share the parent's arrays, but spawn once
+    numba's tbb threading layer has started here, since a process that
+    forks after that hangs when it exits
+    """
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        return None
+    if numba is not None:
+        try:
+            if numba.threading_layer() == 'tbb':
+                return multiprocessing.get_context('spawn')
+        except ValueError:
+            # no parallel kernel has run yet
+            pass
+    return multiprocessing.get_context('fork')
+
+
+def limit_worker_threads():
+    """
+    run the kernels on one thread, in a worker of a pool from pool_context:
+    the pool is already one process per CPU, and the serial kernels are
+    safe in a forked child (see set_num_threads)
+    """
+    set_num_threads(1)
+
+
+if numba is not None:
+
+    # each kernel is the work for one row, with a parallel and a serial
+    # loop over the rows; they are separate functions because numba's cache
+    # doesn't tell apart two builds of one function
+
+    @numba.njit(cache=True)
+    def _count_transits_row(T0, period, edges, istart, iend, words):
+        total = 0.
+        for k in range(istart.shape[0]):
+            if (words[k >> 6] >> np.uint64(k & 63)) & np.uint64(1):
+                nstart = np.floor((edges[istart[k]] - T0) / period) + 1
+                nend = np.floor((edges[iend[k]] - T0) / period) + 1
+                total += max(nend, 0.) - max(nstart, 0.)
+        return total
+
+    @numba.njit(parallel=True, cache=True)
+    def _count_transits_parallel(T0, period, edges, istart, iend, words, out):
+        for i in numba.prange(T0.shape[0]):
+            out[i] = _count_transits_row(T0[i], period[i], edges, istart,
+                                         iend, words[i])
+
+    @numba.njit(cache=True)
+    def _count_transits_serial(T0, period, edges, istart, iend, words, out):
+        for i in range(T0.shape[0]):
+            out[i] = _count_transits_row(T0[i], period[i], edges, istart,
+                                         iend, words[i])
+
+    @numba.njit(cache=True)
+    def _count_transits_matrix_row(transits, words, nsectors):
+        total = 0
+        for k in range(nsectors):
+            if (words[k >> 6] >> np.uint64(k & 63)) & np.uint64(1):
+                total += transits[k]
+        return total
+
+    @numba.njit(parallel=True, cache=True)
+    def _count_transits_matrix_parallel(transits, words, nsectors, out):
+        for i in numba.prange(transits.shape[0]):
+            out[i] = _count_transits_matrix_row(transits[i], words[i],
+                                                nsectors)
+
+    @numba.njit(cache=True)
+    def _count_transits_matrix_serial(transits, words, nsectors, out):
+        for i in range(transits.shape[0]):
+            out[i] = _count_transits_matrix_row(transits[i], words[i],
+                                                nsectors)
+
+    @numba.njit(cache=True)
+    def _footprint_onchip_row(xs, ys, zs, cosl0, sinl0, cosb0, sinb0, scale,
+                              ccd_center, lower, upper, edge, margin):
+        cosdl = xs*cosl0 + ys*sinl0
+        sindl = ys*cosl0 - xs*sinl0
+        cosc = sinb0*zs + cosb0*cosdl
+        s = scale/cosc
+        x = ccd_center + s*sindl
+        y = ccd_center + s*(cosb0*zs - sinb0*cosdl)
+        onx = (((x > 0.0 + margin) and (x < lower - margin)) or
+               ((x > upper + margin) and (x < edge - margin)))
+        ony = (((y > 0.0 + margin) and (y < lower - margin)) or
+               ((y > upper + margin) and (y < edge - margin)))
+        return onx and ony
+
+    @numba.njit(parallel=True, cache=True)
+    def _footprint_onchip_parallel(xyz, pos, cosl0, sinl0, cosb0, sinb0,
+                                   scale, ccd_center, lower, upper, edge,
+                                   margin, out):
+        for j in numba.prange(pos.shape[0]):
+            out[j] = _footprint_onchip_row(
+                xyz[pos[j], 0], xyz[pos[j], 1], xyz[pos[j], 2], cosl0, sinl0,
+                cosb0, sinb0, scale, ccd_center, lower, upper, edge, margin)
+
+    @numba.njit(cache=True)
+    def _footprint_onchip_serial(xyz, pos, cosl0, sinl0, cosb0, sinb0,
+                                 scale, ccd_center, lower, upper, edge,
+                                 margin, out):
+        for j in range(pos.shape[0]):
+            out[j] = _footprint_onchip_row(
+                xyz[pos[j], 0], xyz[pos[j], 1], xyz[pos[j], 2], cosl0, sinl0,
+                cosb0, sinb0, scale, ccd_center, lower, upper, edge, margin)
+
+
+def count_transits(T0, period, edges, istart, iend, words):
+    """
+    compiled count_transits: the transits of each planet in the windows
+    (edges[istart[k]], edges[iend[k]]] whose bit k is set in its row of
+    words, the packed coverage. One pass per planet, in parallel, with no
+    (planet x window) temporaries.
+    """
+    out = np.zeros(len(T0), dtype=np.int64)
+    kernel = _count_transits_parallel if parallel else _count_transits_serial
+    kernel(np.ascontiguousarray(T0, dtype=float),
+           np.ascontiguousarray(period, dtype=float),
+           np.ascontiguousarray(edges, dtype=float),
+           np.ascontiguousarray(istart, dtype=np.int64),
+           np.ascontiguousarray(iend, dtype=np.int64),
+           np.ascontiguousarray(words, dtype='<u8'), out)
+    return out
+
+
+def count_transits_matrix(transits, words, nsectors):
+    """
+    compiled count_transits_matrix: the sum over the first nsectors columns
+    of each row of transits, a transit_matrix, of those whose bit is set in
+    the same row of words, without unpacking the coverage
+    """
+    out = np.zeros(len(transits), dtype=np.int64)
+    kernel = (_count_transits_matrix_parallel if parallel
+              else _count_transits_matrix_serial)
+    kernel(np.ascontiguousarray(transits),
+           np.ascontiguousarray(words, dtype='<u8'), int(nsectors), out)
+    return out
+
+
+def footprint_onchip(xyz, pos, cosl0, sinl0, cosb0, sinb0, scale, ccd_center,
+                     ccd_pix, gap_pix, margin):
+    """
+    compiled CameraFootprint projection and onchip_test of the stars
+    xyz[pos], without gathering their coordinates or any per-star
+    temporaries
+    """
+    lower = (ccd_pix - gap_pix)/2. - 1.
+    upper = (ccd_pix + gap_pix)/2. - 1.
+    edge = (ccd_pix + gap_pix) - 1.
+    out = np.zeros(len(pos), dtype=np.bool_)
+    kernel = _footprint_onchip_parallel if parallel else _footprint_onchip_serial
+    kernel(np.ascontiguousarray(xyz, dtype=float),
+           np.ascontiguousarray(pos, dtype=np.int64),
+           float(cosl0), float(sinl0), float(cosb0), float(sinb0),
+           float(scale), float(ccd_center), float(lower), float(upper),
+           float(edge), float(margin), out)
+    return out
@@ -1,17 +1,20 @@
 import numpy as np
 import pandas as pd
 import sys
+from concurrent.futures import ProcessPoolExecutor
 # import astroquery
 # import matplotlib.pyplot as plt
 # import glob
 from tqdm import tqdm
 # import matplotlib
-from tvguide import TessPointing
+# from tvguide import TessPointing
 from astropy.coordinates import SkyCoord
 from astropy import units as u
 from numpy.random import poisson, beta, uniform
 from numpy import array as nparr
 import simfuncs
+import kernels
+from summaries import MonteCarloSummary, CountReduction, HistogramReduction
 
 from make_catalog import *
 
@@ -21,28 +24,149 @@ consts = {'sigma_threshold': 10,
           'detect_transits': 3,
           'sector_length': 13.7,
           'version': 'OST300',
+          'seed': 300,
+          'nrealizations': 300,
+          # per-planet csv files are written for this many of the
+          # realizations; the rest only go into the summary
+          'write_realizations': 10,
          }
 
+# what is kept of every realization, see summaries.MonteCarloSummary
+SUMMARY_REDUCTIONS = {
+    'detected_primary': CountReduction('detected_primary'),
+    'detected': CountReduction('detected'),
+    'detected_primary_inOptimisticHZ': CountReduction('detected_primary', 'inOptimisticHZ'),
+    'detected_inOptimisticHZ': CountReduction('detected', 'inOptimisticHZ'),
+    'detected_period_radius': HistogramReduction('detected'),
+}
 
-def run_sim(df, i):
-    newDF = calculate_planet_properties(df)
+
+def run_sim(stars, i, star_coverage, rng=np.random, write=True, timeline=None):
+    # a batch of one: the star table from prepare_stars is only read, so
+    # realizations share it instead of each working on a copy
+    newDF = calculate_planet_properties_batch(stars, 1, rng=rng)
 
     selected = newDF[newDF.has_transits == True]
     # selected.to_csv('../data/allCTL7-EM-{}-{}T.csv.bz2'.format(consts['version'], consts['detect_transits']),
     #           compression='bz2')
 
-    out_SNE = get_camera_bouma(selected.reset_index(drop=True), fieldfile='../data/camera_boresights_SNE.csv')
-
-    df_out_SNE = pd.DataFrame(out_SNE, columns=[str(x) for x in range(1, 1+out_SNE.shape[1])])
+    # star positions never change, so coverage is looked up per planet from
+    # the star-level result computed once in __main__, and transits are
+    # only counted for the planets that could be detected at all
+    selected = selected.reset_index(drop=True)
+    candidates = detectable(selected, star_coverage.nsectors, timeline=timeline)
+    out_SNE = get_planet_coverage(stars, selected.starID.values, star_coverage=star_coverage)
 
-    dfw_SNE = pd.concat([selected.reset_index(drop=True), df_out_SNE], axis=1)
-    nsectors = out_SNE.shape[1]
-    dfw_SNE = make_output_arr(dfw_SNE, nsectors)
+    dfw_SNE = make_output_arr(selected, out_SNE, candidates, timeline=timeline)
     print('Planets detected in primary + extended mission SNE: {}'.format(dfw_SNE[dfw_SNE.detected].shape[0]))
     print('Planets detected in primary mission SNE: {}'.format(dfw_SNE[dfw_SNE.detected_primary].shape[0]))
-    dfw_SNE.to_csv('../data/OST_300/obs_SNE-{0}-{1}T-{2:03d}.csv.bz2'.format(consts['version'], consts['detect_transits'],
-                                                                      i),
-              compression='bz2')
+    if write:
+        dfw_SNE.to_csv('../data/OST_300/obs_SNE-{0}-{1}T-{2:03d}.csv.bz2'.format(consts['version'], consts['detect_transits'],
+                                                                          i),
+                  compression='bz2')
+    return dfw_SNE
+
+
+def run_sim_batch(stars, realizations, star_coverage, rng=np.random, write=None,
+                  timeline=None):
+    """
+    run_sim for several realizations in one vectorized pass, writing the
+    same per-realization files for those of them in write (all if None).
+    Returns the planets of all of them, with a 'realization' column counting
+    from 0 through realizations.
+    """
+    realizations = list(realizations)
+    newDF = calculate_planet_properties_batch(stars, len(realizations), rng=rng)
+
+    selected = newDF[newDF.has_transits == True].reset_index(drop=True)
+    candidates = detectable(selected, star_coverage.nsectors, timeline=timeline)
+    out_SNE = get_planet_coverage(stars, selected.starID.values, star_coverage=star_coverage)
+
+    dfw_SNE = make_output_arr(selected, out_SNE, candidates, timeline=timeline)
+    for r, i in enumerate(realizations):
+        dfw = dfw_SNE[dfw_SNE.realization.values == r]
+        print('Planets detected in primary + extended mission SNE: {}'.format(dfw[dfw.detected].shape[0]))
+        print('Planets detected in primary mission SNE: {}'.format(dfw[dfw.detected_primary].shape[0]))
+        if write is not None and i not in write:
+            continue
+        dfw.reset_index(drop=True).to_csv('../data/OST_300/obs_SNE-{0}-{1}T-{2:03d}.csv.bz2'.format(consts['version'], consts['detect_transits'],
+                                                                                           i),
+                                          compression='bz2')
+    return dfw_SNE
+
+
+def realization_rng(seed, i):
+    """
+    random Generator for realization i of the study seeded with seed. It is
+    child i of SeedSequence(seed).spawn(), made directly so that any one
+    realization can be rerun on its own.
+    """
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(i,)))
+
+
+_shared = {}
+
+
+def _init_worker(stars, star_coverage, summary, timeline):
+    _shared['stars'] = stars
+    _shared['star_coverage'] = star_coverage
+    _shared['summary'] = summary
+    _shared['timeline'] = timeline
+
+
+def _init_pool_worker(*args):
+    _init_worker(*args)
+    kernels.limit_worker_threads()
+
+
+def _run_realization(task):
+    realizations, seed, write = task
+    if len(realizations) == 1:
+        dfw = run_sim(_shared['stars'], realizations[0],
+                      _shared['star_coverage'],
+                      rng=realization_rng(seed, realizations[0]),
+                      write=write is None or realizations[0] in write,
+                      timeline=_shared['timeline'])
+    else:
+        dfw = run_sim_batch(_shared['stars'], realizations,
+                            _shared['star_coverage'],
+                            rng=realization_rng(seed, realizations[0]),
+                            write=write, timeline=_shared['timeline'])
+    if _shared['summary'] is None:
+        return realizations, None
+    return realizations, _shared['summary'].reduce(dfw, len(realizations))
+
+
+def run_realizations(stars, star_coverage, realizations, seed=consts['seed'],
+                     nworkers=None, batchsize=1, summary=None, write=None,
+                     timeline=None):
+    """
+    run_sim for the given realizations in a pool of nworkers processes (1 to
+    run them here), batchsize at a time, recording each into summary
+    """
+    realizations = list(realizations)
+    if write is not None:
+        write = set(write)
+    # each task draws from realization_rng of its first realization, so the
+    # output doesn't depend on nworkers or on which worker ran what
+    tasks = [(realizations[start:start + batchsize], seed, write)
+             for start in range(0, len(realizations), batchsize)]
+    if nworkers == 1:
+        _init_worker(stars, star_coverage, summary, timeline)
+        for task in tasks:
+            done, reduced = _run_realization(task)
+            if summary is not None:
+                summary.record(done, reduced)
+        return
+    # the star table and coverage reach each worker once and are only read,
+    # so forked workers share them copy-on-write (see kernels.pool_context)
+    with ProcessPoolExecutor(max_workers=nworkers,
+                             mp_context=kernels.pool_context(),
+                             initializer=_init_pool_worker,
+                             initargs=(stars, star_coverage, summary, timeline)) as pool:
+        for done, reduced in pool.map(_run_realization, tasks):
+            if summary is not None:
+                summary.record(done, reduced)
 
 
 if __name__ == '__main__':
@@ -62,6 +186,17 @@ if __name__ == '__main__':
 
     dfo = pd.read_csv(fn, names=header, usecols=usecols)
 
-    for i in range(300):
-        df = dfo.copy()
-        run_sim(df, i)
+    fieldfile = '../data/camera_boresights_SNE.csv'
+    star_coverage = get_camera_bouma_cached(dfo, fieldfile=fieldfile)
+    timeline = get_timeline(fieldfile)
+
+    # star properties that don't change between realizations, worked out once
+    stars = prepare_stars(dfo)
+    del dfo
+
+    summary = MonteCarloSummary(SUMMARY_REDUCTIONS, consts['nrealizations'])
+    run_realizations(stars, star_coverage, range(consts['nrealizations']),
+                     seed=consts['seed'], summary=summary,
+                     write=range(consts['write_realizations']),
+                     timeline=timeline)
+    summary.save('../data/OST_300/summary_SNE-{0}-{1}T.npz'.format(consts['version'], consts['detect_transits']))
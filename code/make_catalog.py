@@ -1,96 +1,103 @@
 import numpy as np
 import pandas as pd
 import sys
+import os
 # import astroquery
 # import matplotlib.pyplot as plt
 # import glob
 from tqdm import tqdm
 # import matplotlib
-from tvguide import TessPointing
 from astropy.coordinates import SkyCoord
 from astropy import units as u
 from numpy.random import poisson, beta, uniform
 from numpy import array as nparr
 import simfuncs
+from sector_coverage import coverage_cache_key, cached_coverage
+from timeline import MissionTimeline
 
 tqdm.pandas()
 
 # see https://github.com/lgbouma/tessmaps and https://github.com/lgbouma/extend_tess
-from tessmaps.get_time_on_silicon import given_cameras_get_stars_on_silicon as gcgss
+from coverage_map import pointing_coverage
+from get_time_on_silicon import icrs_to_ecliptic, get_sector_cameras
 
 consts = {'sigma_threshold': 10,
           'detect_transits': 3,
           'sector_length': 13.7,
+          # days at the end of each orbit lost to the data downlink
+          'downlink': 1.,
           'version': 'v5',
           }
 
 
-def get_camera(df, strategy='SNSNS'):
-    # now add tvguide cameras
+def get_camera(df, strategy='SNSNS', batch=False):
+    """
+    camera number in each of the 13 sectors of years 1 to 5, 0 where a star
+    isn't observed, for the given strategy. Northern years use the southern
+    schedule with the stars' ecliptic latitudes mirrored. By default the
+    camera numbers come star by star from tvguide; with batch they come for
+    all stars at once from get_sector_cameras, which approximates tvguide's
+    geometry and can differ from it for stars near a CCD edge.
+    """
     year1cameras = np.zeros((df.shape[0], 13), dtype='int')
     year2cameras = np.zeros((df.shape[0], 13), dtype='int')
     year3cameras = np.zeros((df.shape[0], 13), dtype='int')
     year4cameras = np.zeros((df.shape[0], 13), dtype='int')
     year5cameras = np.zeros((df.shape[0], 13), dtype='int')
 
-    if strategy == 'SNSNS':
-        for i in tqdm(df.index):
-            objS = TessPointing(df.loc[i, 'RA'], df.loc[i, 'DEC'])
-            camerasS = objS.get_13cameras()
-            year1cameras[i] = camerasS
-            year3cameras[i] = camerasS
-            year5cameras[i] = camerasS
-
-            # hack to northern targets
-            gc = SkyCoord(lon=df.loc[i, 'ECLONG'] * u.degree,
-                          lat=df.loc[i, 'ECLAT'] * u.degree * -1,
-                          frame='barycentrictrueecliptic')
-            objN = TessPointing(gc.icrs.ra.value, gc.icrs.dec.value)
-            camerasN = objN.get_13cameras()
-            year2cameras[i] = camerasN
-            year4cameras[i] = camerasN
+    if strategy not in ('SNSNS', 'SNNSN', 'SNE'):
+        return [year1cameras, year2cameras, year3cameras, year4cameras, year5cameras]
 
-    elif strategy == 'SNNSN':
-        for i in tqdm(df.index):
+    if batch:
+        elon, elat = get_star_ecliptic(df)
+        camerasS = get_sector_cameras(elon, elat)
+        # hack to northern targets
+        camerasN = get_sector_cameras(elon, -elat)
+    else:
+        from tvguide import TessPointing
+        camerasS = np.zeros((df.shape[0], 13), dtype='int')
+        camerasN = np.zeros((df.shape[0], 13), dtype='int')
+        for j, i in enumerate(tqdm(df.index)):
             objS = TessPointing(df.loc[i, 'RA'], df.loc[i, 'DEC'])
-            camerasS = objS.get_13cameras()
-            year1cameras[i] = camerasS
-            year4cameras[i] = camerasS
+            camerasS[j] = objS.get_13cameras()
 
             # hack to northern targets
             gc = SkyCoord(lon=df.loc[i, 'ECLONG'] * u.degree,
                           lat=df.loc[i, 'ECLAT'] * u.degree * -1,
                           frame='barycentrictrueecliptic')
             objN = TessPointing(gc.icrs.ra.value, gc.icrs.dec.value)
-            camerasN = objN.get_13cameras()
-            year2cameras[i] = camerasN
-            year3cameras[i] = camerasN
-            year5cameras[i] = camerasN
+            camerasN[j] = objN.get_13cameras()
 
-    elif strategy == 'SNE':
-        for i in tqdm(df.index):
-            # for SNE the sector order is
-            # year 1: south,
-            # year 2: north
-            # year 3: NNNEEEEESSSSS
-            # year 4: SSSSSSSSNNNNN
-            # year 5: NNNNNNNNNNNNN
-            objS = TessPointing(df.loc[i, 'RA'], df.loc[i, 'DEC'])
-            gc = SkyCoord(lon=df.loc[i, 'ECLONG'] * u.degree,
-                          lat=df.loc[i, 'ECLAT'] * u.degree * -1,
-                          frame='barycentrictrueecliptic')
-            objN = TessPointing(gc.icrs.ra.value, gc.icrs.dec.value)
-            camerasS = objS.get_13cameras()
-            camerasN = objN.get_13cameras()
-            year1cameras[i] = camerasS
-            year2cameras[i] = camerasN
-            year5cameras[i] = camerasN
+    if strategy == 'SNSNS':
+        year1cameras[:] = camerasS
+        year3cameras[:] = camerasS
+        year5cameras[:] = camerasS
+        year2cameras[:] = camerasN
+        year4cameras[:] = camerasN
 
-            year4cameras[i] = camerasN
-            year4cameras[i, 0:8] = camerasS[0:8]
+    elif strategy == 'SNNSN':
+        year1cameras[:] = camerasS
+        year4cameras[:] = camerasS
+        year2cameras[:] = camerasN
+        year3cameras[:] = camerasN
+        year5cameras[:] = camerasN
 
-            year3cameras[i] = camerasS
-            year3cameras[i, 0:3] = camerasN[0:3]
+    elif strategy == 'SNE':
+        # for SNE the sector order is
+        # year 1: south,
+        # year 2: north
+        # year 3: NNNEEEEESSSSS
+        # year 4: SSSSSSSSNNNNN
+        # year 5: NNNNNNNNNNNNN
+        year1cameras[:] = camerasS
+        year2cameras[:] = camerasN
+        year5cameras[:] = camerasN
+
+        year4cameras[:] = camerasN
+        year4cameras[:, 0:8] = camerasS[:, 0:8]
+
+        year3cameras[:] = camerasS
+        year3cameras[:, 0:3] = camerasN[:, 0:3]
 
         ecl_pointings = get_ecl_pointings(df)
         year3cameras[:, 3:8] = ecl_pointings
@@ -98,22 +105,72 @@ def get_camera(df, strategy='SNSNS'):
     return [year1cameras, year2cameras, year3cameras, year4cameras, year5cameras]
 
 
-def get_camera_bouma(df, fieldfile='../data/camera_boresights_SNE-shifted.csv'):
+def get_star_ecliptic(df):
+    """
+    ecliptic longitude and latitude of the stars in degrees: the catalog's
+    ECLONG/ECLAT where it has them, otherwise RA/DEC turned by a cached
+    rotation matrix, so astropy's frame machinery never runs per star
     """
-    Like get_camera, only better
+    elon = np.full(df.shape[0], np.nan)
+    elat = np.full(df.shape[0], np.nan)
+    if 'ECLONG' in df.columns and 'ECLAT' in df.columns:
+        elon[:] = df.loc[:, 'ECLONG'].values
+        elat[:] = df.loc[:, 'ECLAT'].values
+    missing = np.isnan(elon) | np.isnan(elat)
+    if missing.any():
+        elon[missing], elat[missing] = icrs_to_ecliptic(
+            df.loc[:, 'RA'].values[missing], df.loc[:, 'DEC'].values[missing])
+    return elon, elat
+
+
+def get_camera_bouma(df, fieldfile='../data/camera_boresights_SNE-shifted.csv',
+                     nworkers=1):
+    """
+    Like get_camera, only better. nworkers > 1 (or None, for one per CPU)
+    splits the stars across a process pool, with identical results.
     """
     camdf = get_camera_coords(fieldfile)
-    observed = np.zeros((df.shape[0], camdf.shape[0]), dtype='int')
+    elon, elat = get_star_ecliptic(df)
+    return pointing_coverage(elon, elat, get_unique_pointings(camdf),
+                             camdf['pointing'].values, nworkers=nworkers)
+
+
+def get_camera_bouma_cached(df, fieldfile='../data/camera_boresights_SNE-shifted.csv',
+                            cachedir='../data/coverage_cache', nworkers=1):
+    """
+    get_camera_bouma, saved to cachedir under a hash of the stars' ecliptic
+    coordinates (as projected, see get_star_ecliptic) and the boresight
+    file. Later calls with the same catalog and strategy load it back
+    memory-mapped instead of redoing the geometry.
+    """
+    elon, elat = get_star_ecliptic(df)
+    key = coverage_cache_key(elon, elat, fieldfile)
+    nsectors = get_camera_coords(fieldfile).shape[0]
+    return cached_coverage(os.path.join(cachedir, key + '.npy'), nsectors,
+                           lambda: get_camera_bouma(df, fieldfile=fieldfile,
+                                                    nworkers=nworkers))
 
-    for ix, row in tqdm(camdf.iterrows(), total=camdf.shape[0]):
-        cam_direction = row['camdirection']
-        gc = SkyCoord(ra=df.loc[:, 'RA'].values * u.degree,
-                      dec=df.loc[:, 'DEC'].values * u.degree,
-                      frame='icrs')
-        onchip = gcgss(gc, cam_direction, verbose=False)
-        observed[:, ix] = onchip
 
-    return observed
+def get_planet_coverage(stars, starID, fieldfile='../data/camera_boresights_SNE-shifted.csv',
+                        star_coverage=None, cachedir=None):
+    """
+    SectorCoverage of each planet, given the star table and each planet's
+    starID (its row number in stars). Coverage is worked out once per star
+    and broadcast to that star's planets. Pass star_coverage, from
+    get_camera_bouma(stars, fieldfile), to reuse it across realizations, or
+    a cachedir to use the coverage of every star cached on disk; otherwise
+    only the stars that host one of the planets are computed.
+    """
+    starID = np.asarray(starID)
+    if star_coverage is None and cachedir is not None:
+        star_coverage = get_camera_bouma_cached(stars, fieldfile=fieldfile,
+                                                cachedir=cachedir)
+    if star_coverage is not None:
+        return star_coverage.take(starID)
+    hosts, host_index = np.unique(starID, return_inverse=True)
+    host_coverage = get_camera_bouma(
+        stars.iloc[hosts].reset_index(drop=True), fieldfile=fieldfile)
+    return host_coverage.take(host_index)
 
 
 def get_camera_coords(camfn):
@@ -141,55 +198,125 @@ def get_camera_coords(camfn):
 
         cam_directions.append(this_cam_dirn)
     camdf['camdirection'] = cam_directions
+
+    # orbits repeat pointings (two orbits per sector, and whole sectors
+    # across years), so number the distinct four-camera pointings
+    _, pointing = np.unique(np.c_[lats, lons], axis=0, return_inverse=True)
+    camdf['pointing'] = pointing.reshape(-1)
     return camdf
 
 
+def get_timeline(fieldfile):
+    """
+    MissionTimeline of the orbits in a boresight file, from their dates
+    """
+    return MissionTimeline.from_boresights(fieldfile, downlink=consts['downlink'])
+
+
+def get_unique_pointings(camdf):
+    """
+    the distinct camdirections in camdf, ordered by camdf['pointing']
+    """
+    return list(camdf.groupby('pointing')['camdirection'].first())
+
+
 def get_ecl_pointings(df, start=0, nsectors=5):
     # draw a rectangle of +/- 12 degrees, and 96 degrees
-    outarr = np.zeros((df.shape[0], nsectors), dtype='int')
-    for snum in range(nsectors):
-        elon = df.loc[:, 'ECLONG']
-        elat = df.loc[:, 'ECLAT']
-        emin = start
-        emax = start + 96
-        mask = ((elon >= emin) & (elon < emax) &
-                np.abs(elat <= 12))
-        outarr[mask, snum] = 9
-        start += 27.7
-    return outarr
-
-
-def calculate_planet_properties(df):
+    elon = df.loc[:, 'ECLONG'].values[:, None]
+    elat = df.loc[:, 'ECLAT'].values[:, None]
+    # the same float sums as adding 27.7 to start sector by sector
+    emin = np.cumsum(np.r_[start, np.full(nsectors - 1, 27.7)])[None, :]
+    emax = emin + 96
+    mask = ((elon >= emin) & (elon < emax) &
+            np.abs(elat <= 12))
+    return np.where(mask, 9, 0)
+
+
+def calculate_planet_properties(df, rng=np.random):
     df['isMdwarf'] = np.where(
         (df.TEFF < 3900) & (df.RADIUS < 0.6), True, False)
     df['isGiant'] = np.ones(df.shape[0], dtype='bool')  # assume all dwarfs
-    df['isSubgiant'] = np.where(np.random.random(
+    df['isSubgiant'] = np.where(rng.random(
         size=df.shape[0]) < 0.25, True, False)
     df.loc[df.isSubgiant & ~df.isMdwarf, 'RADIUS'] = df.RADIUS * 2
-    df['cosi'] = pd.Series(np.random.random(size=df.shape[0]), name='cosi')
+    df['cosi'] = pd.Series(rng.random(size=df.shape[0]), name='cosi')
     df['noise_level'] = simfuncs.component_noise(
         df.TESSMAG, readmod=1, zodimod=1)
 
     # I need to change the lambdas to account for the increased parameter space size
     # for fgk going from 0.689 -> 1.10 because there are 60 percent more balls
     # for m going from 2.5 -> 2.96 because there are 18 percent more balls
-    np_fgk = poisson(lam=1.10, size=df.shape[0])
-    np_m = poisson(lam=2.96, size=df.shape[0])
+    np_fgk = rng.poisson(lam=1.10, size=df.shape[0])
+    np_m = rng.poisson(lam=2.96, size=df.shape[0])
     df['Nplanets'] = pd.Series(
         np.where(df.isMdwarf, np_m, np_fgk), name='Nplanets')
 
     starID = 0  # ???
-    newDF, starID = simfuncs.make_allplanets_df_vec_extrap(df, starID)
+    newDF, starID = simfuncs.make_allplanets_df_vec_extrap(df, starID, rng=rng)
+    return add_planet_properties(newDF, rng=rng)
+
+
+def prepare_stars(df):
+    """
+    a copy of the star table with the star properties that are the same in
+    every realization worked out once: isMdwarf, isGiant and noise_level
+    """
+    stars = df.copy()
+    stars['isMdwarf'] = np.where(
+        (stars.TEFF < 3900) & (stars.RADIUS < 0.6), True, False)
+    stars['isGiant'] = np.ones(stars.shape[0], dtype='bool')  # assume all dwarfs
+    stars['noise_level'] = simfuncs.component_noise(
+        stars.TESSMAG, readmod=1, zodimod=1)
+    return stars
+
+
+def calculate_planet_properties_batch(stars, nrealizations, rng=np.random):
+    """
+    calculate_planet_properties for nrealizations realizations of the stars
+    in one vectorized pass. Returns the planets of all of them, with a
+    'realization' column (0 to nrealizations - 1); starID is the host's row
+    in stars. With nrealizations=1 the draws, and so the planets, are the
+    same as calculate_planet_properties.
+
+    stars, from prepare_stars, is only read: the per-realization subgiant
+    radii, cosi and planet counts are overlaid on the planets, so
+    realizations can share one star table without copying it.
+    """
+    if not {'isMdwarf', 'isGiant', 'noise_level'} <= set(stars.columns):
+        stars = prepare_stars(stars)
+    shape = (nrealizations, stars.shape[0])
+    isMdwarf = stars.isMdwarf.values
+    isSubgiant = rng.random(size=shape) < 0.25
+    radius = np.where(isSubgiant & ~isMdwarf,
+                      stars.RADIUS.values * 2, stars.RADIUS.values)
+    cosi = rng.random(size=shape)
+
+    np_fgk = rng.poisson(lam=1.10, size=shape)
+    np_m = rng.poisson(lam=2.96, size=shape)
+    nplanets = np.where(isMdwarf, np_m, np_fgk)
+
+    newDF = simfuncs.make_allplanets_df_batch(
+        stars, nplanets,
+        overlays={'isSubgiant': isSubgiant, 'RADIUS': radius, 'cosi': cosi},
+        rng=rng)
+    return add_planet_properties(newDF, rng=rng)
+
+
+def add_planet_properties(newDF, rng=np.random):
+    """
+    draw the orbits of the planets from make_allplanets_df_vec_extrap and
+    work out their transit properties
+    """
     newDF = newDF.assign(T0=pd.Series(
-        uniform(0, 1, size=newDF.shape[0]) * newDF.loc[:, 'planetPeriod']))
+        rng.uniform(0, 1, size=newDF.shape[0]) * newDF.loc[:, 'planetPeriod']))
 
     newDF['ars'] = simfuncs.per2ars(
         newDF.planetPeriod, newDF.MASS, newDF.RADIUS)
     # ecc dist from Van Eylen 2015
     newDF['ecc'] = pd.Series(
-        beta(1.03, 13.6, size=newDF.shape[0]), name='ecc', )
+        rng.beta(1.03, 13.6, size=newDF.shape[0]), name='ecc', )
     newDF['omega'] = pd.Series(
-        uniform(-np.pi, np.pi, size=newDF.shape[0]), name='omega')
+        rng.uniform(-np.pi, np.pi, size=newDF.shape[0]), name='omega')
     newDF['rprs'] = simfuncs.get_rprs(newDF.planetRadius, newDF.RADIUS)
     newDF['impact'] = newDF.cosi * newDF.ars * \
         ((1 - newDF.ecc**2) / 1 + newDF.ecc * np.sin(newDF.omega))  # cite Winn
@@ -207,29 +334,15 @@ def calculate_planet_properties(df):
     return newDF
 
 
-def get_ntransits(row, sectorlength=13.7, nsectors=114):
-    totalMissionDuration = sectorlength * nsectors
-    transitTimes = np.arange(
-        row.loc['T0'], totalMissionDuration, row.loc['planetPeriod'])
-    bins = sectorlength * np.arange(0, 1 + nsectors)
-    inds = np.digitize(transitTimes, bins=bins, right=True)
-    inds = inds[inds < nsectors + 1]  # assuming we go 4 years and 5 months
-    return np.count_nonzero(inds * row.loc[[str(x) for x in inds]])
-
-
-def get_ntransits_primary(row, sectorlength=13.7, nsectors=114):
-    totalMissionDuration = sectorlength * nsectors
-    transitTimes = np.arange(
-        row.loc['T0'], totalMissionDuration, row.loc['planetPeriod'])
-    if sectorlength < 20:
-        bins = sectorlength * np.arange(0, 1 + (26 * 2))
-        inds = np.digitize(transitTimes, bins=bins, right=True)
-        inds = inds[inds < 1 + (26 * 2)]
-    else:
-        bins = sectorlength * np.arange(0, 1 + (13 * 2))
-        inds = np.digitize(transitTimes, bins=bins, right=True)
-        inds = inds[inds < 1 + (13 * 2)]
-    return np.count_nonzero(inds * row.loc[[str(x) for x in inds]])
+def _fill_candidates(values, candidates):
+    """
+    values of the candidate rows, spread over all rows with zeros elsewhere
+    """
+    if candidates.all():
+        return values
+    out = np.zeros(candidates.shape[0], dtype=values.dtype)
+    out[candidates] = values
+    return out
 
 
 def get_insol(teff, ars):
@@ -238,18 +351,137 @@ def get_insol(teff, ars):
     return p1 * p2
 
 
-def make_output_arr(dfx, nsectors):
-    # which stars are observed
-    obscols = [str(x) for x in range(1, nsectors + 1)]
-    dfx.loc[:, 'isObserved'] = dfx.loc[:, obscols].sum(axis=1) > 0
+def detectable(dfx, nsectors, timeline=None, sectorlength=None,
+               sigma_threshold=None, detect_transits=None):
+    """
+    which planets of dfx could be detected in a mission of nsectors
+    sectors (of timeline, if given): those that would pass
+    make_output_arr's detection test with every transit from the start of
+    the mission to its end observed, the most they could have. The test
+    only gets harder with fewer transits, so the rest can't be detected
+    whatever the coverage. The sector length and thresholds are those of
+    consts unless given, e.g. for Kepler's quarters.
+    """
+    if sectorlength is None:
+        sectorlength = consts['sector_length']
+    if sigma_threshold is None:
+        sigma_threshold = consts['sigma_threshold']
+    if detect_transits is None:
+        detect_transits = consts['detect_transits']
+    nmax = simfuncs.max_transits(dfx.T0.values, dfx.planetPeriod.values,
+                                 sectorlength=sectorlength,
+                                 nsectors=nsectors, timeline=timeline)
+    needed = (dfx.transit_depth_diluted.values * dfx.duration_correction.values *
+              np.sqrt(nmax)) / sigma_threshold
+    return ((dfx.noise_level.values < needed) &
+            (nmax >= detect_transits) &
+            (dfx.planetRadius.values > 0.0) &
+            dfx.has_transits.values.astype(bool))
+
+
+def primary_sectors():
+    """
+    number of sectors in the primary mission
+    """
+    if consts['sector_length'] < 20:
+        return 26 * 2
+    return 13 * 2
+
+
+def make_output_arr(dfx, coverage, candidates=None, timeline=None):
+    """
+    coverage is the SectorCoverage of each row of dfx. timeline is the
+    MissionTimeline of its sectors, e.g. from get_timeline; without one,
+    sectors are back to back and consts['sector_length'] long.
+
+    With candidates, a boolean mask over dfx such as from detectable(), only
+    the transits of the candidate rows are counted. The other rows can't be
+    detected: they get detected False and 0 for the transit counts and the
+    SNRs, which aren't worked out.
+    """
+    candidates, candidate_coverage = _candidate_coverage(coverage, candidates)
+    T0 = dfx.T0.values[candidates]
+    period = dfx.planetPeriod.values[candidates]
 
     # how many observed transits
-    # this line takes several minutes
-    dfx.loc[:, 'Ntransits'] = dfx.progress_apply(get_ntransits, axis=1)
+    ntransits = simfuncs.count_transits(
+        T0, period, candidate_coverage, sectorlength=consts['sector_length'],
+        timeline=timeline)
 
     # how many observed transits in the primary mission
-    dfx.loc[:, 'Ntransits_primary'] = dfx.progress_apply(
-        get_ntransits_primary, axis=1)
+    ntransits_primary = simfuncs.count_transits(
+        T0, period, candidate_coverage, sectorlength=consts['sector_length'],
+        nsectors=primary_sectors(), timeline=timeline)
+    return _add_detections(dfx, candidates, coverage.any(), ntransits,
+                           ntransits_primary)
+
+
+def make_output_arrs(dfx, coverages, candidates=None, timelines=None):
+    """
+    make_output_arr for several pointing strategies at once: coverages maps
+    each strategy's name to the SectorCoverage of the rows of dfx, and
+    timelines, if given, each name to the MissionTimeline of its sectors.
+    Returns a dict of the same names to a copy of dfx with that strategy's
+    columns.
+
+    The transits of each planet in each sector are worked out once per
+    distinct timeline, with simfuncs.transit_matrix, and each strategy only
+    masks that with its coverage, so every strategy after the first costs
+    one multiply-and-sum over the matrix rather than recounting the
+    transits.
+    """
+    if candidates is None:
+        candidates = np.ones(dfx.shape[0], dtype=bool)
+    else:
+        candidates = np.asarray(candidates, dtype=bool)
+    if timelines is None:
+        timelines = dict.fromkeys(coverages)
+    matrices = {}
+    for timeline in timelines.values():
+        if timeline in matrices:
+            continue
+        nsectors = max([primary_sectors()] +
+                       [coverages[name].nsectors for name in coverages
+                        if timelines[name] == timeline])
+        matrices[timeline] = simfuncs.transit_matrix(
+            dfx.T0.values[candidates], dfx.planetPeriod.values[candidates],
+            nsectors, sectorlength=consts['sector_length'], timeline=timeline)
+    out = {}
+    for name, coverage in coverages.items():
+        transits = matrices[timelines[name]]
+        candidate_coverage = _candidate_coverage(coverage, candidates)[1]
+        ntransits = simfuncs.count_transits_matrix(transits,
+                                                   candidate_coverage)
+        ntransits_primary = simfuncs.count_transits_matrix(
+            transits, candidate_coverage, nsectors=primary_sectors())
+        out[name] = _add_detections(dfx.copy(), candidates, coverage.any(),
+                                    ntransits, ntransits_primary)
+    return out
+
+
+def _candidate_coverage(coverage, candidates):
+    """
+    candidates as a boolean mask (all rows if None), and the rows of
+    coverage it selects
+    """
+    if candidates is None:
+        return np.ones(len(coverage), dtype=bool), coverage
+    candidates = np.asarray(candidates, dtype=bool)
+    if candidates.all():
+        return candidates, coverage
+    return candidates, coverage.take(np.flatnonzero(candidates))
+
+
+def _add_detections(dfx, candidates, isObserved, ntransits, ntransits_primary):
+    """
+    the columns of make_output_arr from the observed flags of all rows and
+    the candidate rows' transit counts
+    """
+    # which stars are observed
+    dfx.loc[:, 'isObserved'] = isObserved
+    dfx.loc[:, 'Ntransits'] = _fill_candidates(ntransits, candidates)
+    dfx.loc[:, 'Ntransits_primary'] = _fill_candidates(ntransits_primary,
+                                                       candidates)
 
     # get SNR
     dfx.loc[:, 'SNR'] = (dfx.transit_depth_diluted * dfx.duration_correction *
@@ -299,67 +531,30 @@ if __name__ == '__main__':
     selected.to_csv('../data/allCTL7-EM-{}-{}T.csv.bz2'.format(consts['version'], consts['detect_transits']),
                     compression='bz2')
 
-    out_SNE = get_camera_bouma(selected.reset_index(
-        drop=True), fieldfile='../data/camera_boresights_SNE-shifted.csv')
-    out_SNSNS = get_camera_bouma(selected.reset_index(
-        drop=True), fieldfile='../data/camera_boresights_SNSNS.csv')
-    out_SNNSN = get_camera_bouma(selected.reset_index(
-        drop=True), fieldfile='../data/camera_boresights_SNNSN.csv')
-    out_EC3PO = get_camera_bouma(selected.reset_index(
-        drop=True), fieldfile='../data/camera_boresights_EC3PO.csv')
-
-    df_out_SNE = pd.DataFrame(out_SNE, columns=[str(
-        x) for x in range(1, 1 + out_SNE.shape[1])])
-    df_out_SNSNS = pd.DataFrame(
-        out_SNSNS, columns=[str(x) for x in range(1, 1 + out_SNE.shape[1])])
-    df_out_SNNSN = pd.DataFrame(
-        out_SNNSN, columns=[str(x) for x in range(1, 1 + out_SNE.shape[1])])
-    df_out_EC3PO = pd.DataFrame(
-        out_EC3PO, columns=[str(x) for x in range(1, 1 + out_SNE.shape[1])])
-
-    dfw_SNE = pd.concat([selected.reset_index(drop=True), df_out_SNE], axis=1)
-    nsectors = out_SNE.shape[1]
-    dfw_SNE = make_output_arr(dfw_SNE, nsectors)
-    print('Planets detected in primary + extended mission SNE: {}'.format(
-        dfw_SNE[dfw_SNE.detected].shape[0]))
-    print('Planets detected in primary mission SNE: {}'.format(
-        dfw_SNE[dfw_SNE.detected_primary].shape[0]))
-    dfw_SNE.to_csv('../data/obs_SNE-{}-{}T.csv.bz2'.format(consts['version'], consts['detect_transits']),
+    # strategies with the same schedule share their per-sector transit counts
+    fieldfiles = {
+        'SNE': '../data/camera_boresights_SNE-shifted.csv',
+        'SNSNS': '../data/camera_boresights_SNSNS.csv',
+        'SNNSN': '../data/camera_boresights_SNNSN.csv',
+        'EC3PO': '../data/camera_boresights_EC3PO.csv',
+    }
+    coverages = {
+        strategy: get_planet_coverage(df, selected.starID.values,
+                                      fieldfile=fieldfile)
+        for strategy, fieldfile in fieldfiles.items()}
+    timelines = {strategy: get_timeline(fieldfile)
+                 for strategy, fieldfile in fieldfiles.items()}
+    dfws = make_output_arrs(selected.reset_index(drop=True), coverages,
+                            timelines=timelines)
+
+    for strategy, dfw in dfws.items():
+        print('Planets detected in primary + extended mission {}: {}'.format(
+            strategy, dfw[dfw.detected].shape[0]))
+        print('Planets detected in primary mission {}: {}'.format(
+            strategy, dfw[dfw.detected_primary].shape[0]))
+        dfw.to_csv('../data/obs_{}-{}-{}T.csv.bz2'.format(strategy, consts['version'], consts['detect_transits']),
                    compression='bz2')
 
-    dfw_SNSNS = pd.concat(
-        [selected.reset_index(drop=True), df_out_SNSNS], axis=1)
-    nsectors = out_SNSNS.shape[1]
-    dfw_SNSNS = make_output_arr(dfw_SNSNS, nsectors)
-    print('Planets detected in primary + extended mission SNSNS: {}'.format(
-        dfw_SNSNS[dfw_SNSNS.detected].shape[0]))
-    print('Planets detected in primary mission SNSNS: {}'.format(
-        dfw_SNSNS[dfw_SNSNS.detected_primary].shape[0]))
-    dfw_SNSNS.to_csv('../data/obs_SNSNS-{}-{}T.csv.bz2'.format(consts['version'], consts['detect_transits']),
-                     compression='bz2')
-
-    dfw_SNNSN = pd.concat(
-        [selected.reset_index(drop=True), df_out_SNNSN], axis=1)
-    nsectors = out_SNNSN.shape[1]
-    dfw_SNNSN = make_output_arr(dfw_SNNSN, nsectors)
-    print('Planets detected in primary + extended mission SNNSN: {}'.format(
-        dfw_SNNSN[dfw_SNNSN.detected].shape[0]))
-    print('Planets detected in primary mission SNNSN: {}'.format(
-        dfw_SNNSN[dfw_SNE.detected_primary].shape[0]))
-    dfw_SNNSN.to_csv('../data/obs_SNNSN-{}-{}T.csv.bz2'.format(consts['version'], consts['detect_transits']),
-                     compression='bz2')
-
-    dfw_EC3PO = pd.concat(
-        [selected.reset_index(drop=True), df_out_EC3PO], axis=1)
-    nsectors = out_EC3PO.shape[1]
-    dfw_EC3PO = make_output_arr(dfw_EC3PO, nsectors)
-    print('Planets detected in primary + extended mission EC3PO: {}'.format(
-        dfw_EC3PO[dfw_EC3PO.detected].shape[0]))
-    print('Planets detected in primary mission EC3PO: {}'.format(
-        dfw_EC3PO[dfw_EC3PO.detected_primary].shape[0]))
-    dfw_EC3PO.to_csv('../data/obs_EC3PO-{}-{}T.csv.bz2'.format(consts['version'], consts['detect_transits']),
-                     compression='bz2')
-
     print('doing the final save of all the transits')
     newDF.to_csv('/home/tom/Dropbox/filetransfer/allCTL7-EM-{}-everything.csv.bz2'.format(consts['version']),
                  compression='bz2')
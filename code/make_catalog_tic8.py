@@ -16,7 +16,7 @@ import simfuncs
 tqdm.pandas()
 
 # see https://github.com/lgbouma/tessmaps and https://github.com/lgbouma/extend_tess
-from tessmaps.get_time_on_silicon import given_cameras_get_stars_on_silicon as gcgss
+from make_catalog import get_planet_coverage, get_timeline
 
 consts = {'sigma_threshold': 10,
           'detect_transits': 3,
@@ -98,98 +98,49 @@ consts = {'sigma_threshold': 10,
 #     return [year1cameras, year2cameras, year3cameras, year4cameras, year5cameras]
 
 
-def get_camera_bouma(df, fieldfile='../data/camera_boresights_SNE-shifted.csv'):
-    """
-    Like get_camera, only better
-    """
-    camdf = get_camera_coords(fieldfile)
-    observed = np.zeros((df.shape[0], camdf.shape[0]), dtype='int')
-
-    for ix, row in tqdm(camdf.iterrows(), total=camdf.shape[0]):
-        cam_direction = row['camdirection']
-        gc = SkyCoord(ra=df.loc[:, 'RA'].values * u.degree,
-                      dec=df.loc[:, 'DEC'].values * u.degree,
-                      frame='icrs')
-        onchip = gcgss(gc, cam_direction, verbose=False)
-        observed[:, ix] = onchip
-
-    return observed
-
-
-def get_camera_coords(camfn):
-    camdf = pd.read_csv(camfn, sep=';')
-    lats = nparr([
-        nparr(camdf['cam1_elat']),
-        nparr(camdf['cam2_elat']),
-        nparr(camdf['cam3_elat']),
-        nparr(camdf['cam4_elat'])]).T
-    lons = nparr([
-        nparr(camdf['cam1_elon']),
-        nparr(camdf['cam2_elon']),
-        nparr(camdf['cam3_elon']),
-        nparr(camdf['cam4_elon'])]).T
-    cam_directions = []
-    for lat, lon in zip(lats, lons):
-
-        c1lat, c2lat, c3lat, c4lat = lat[0], lat[1], lat[2], lat[3]
-        c1lon, c2lon, c3lon, c4lon = lon[0], lon[1], lon[2], lon[3]
-
-        this_cam_dirn = [(c1lat, c1lon),
-                         (c2lat, c2lon),
-                         (c3lat, c3lon),
-                         (c4lat, c4lon)]
-
-        cam_directions.append(this_cam_dirn)
-    camdf['camdirection'] = cam_directions
-    return camdf
-
-
 def get_ecl_pointings(df, start=0, nsectors=5):
     # draw a rectangle of +/- 12 degrees, and 96 degrees
-    outarr = np.zeros((df.shape[0], nsectors), dtype='int')
-    for snum in range(nsectors):
-        elon = df.loc[:, 'ECLONG']
-        elat = df.loc[:, 'ECLAT']
-        emin = start
-        emax = start + 96
-        mask = ((elon >= emin) & (elon < emax) &
-                np.abs(elat <= 12))
-        outarr[mask, snum] = 9
-        start += 27.7
-    return outarr
-
-
-def calculate_planet_properties(df):
+    elon = df.loc[:, 'ECLONG'].values[:, None]
+    elat = df.loc[:, 'ECLAT'].values[:, None]
+    # the same float sums as adding 27.7 to start sector by sector
+    emin = np.cumsum(np.r_[start, np.full(nsectors - 1, 27.7)])[None, :]
+    emax = emin + 96
+    mask = ((elon >= emin) & (elon < emax) &
+            np.abs(elat <= 12))
+    return np.where(mask, 9, 0)
+
+
+def calculate_planet_properties(df, rng=np.random):
     df['isMdwarf'] = np.where(
         (df.TEFF < 3900) & (df.RADIUS < 0.6), True, False)
     df['isGiant'] = np.ones(df.shape[0], dtype='bool')  # assume all dwarfs
-    # df['isSubgiant'] = np.where(np.random.random(
+    # df['isSubgiant'] = np.where(rng.random(
     #     size=df.shape[0]) < 0.25, True, False)
     # df.loc[df.isSubgiant & ~df.isMdwarf, 'RADIUS'] = df.RADIUS * 2
-    df['cosi'] = pd.Series(np.random.random(size=df.shape[0]), name='cosi')
+    df['cosi'] = pd.Series(rng.random(size=df.shape[0]), name='cosi')
     df['noise_level'] = simfuncs.component_noise(
         df.TESSMAG, readmod=1, zodimod=1)
 
     # I need to change the lambdas to account for the increased parameter space size
     # for fgk going from 0.689 -> 1.10 because there are 60 percent more balls
     # for m going from 2.5 -> 2.96 because there are 18 percent more balls
-    np_fgk = poisson(lam=1.10, size=df.shape[0])
-    np_m = poisson(lam=2.96, size=df.shape[0])
+    np_fgk = rng.poisson(lam=1.10, size=df.shape[0])
+    np_m = rng.poisson(lam=2.96, size=df.shape[0])
     df['Nplanets'] = pd.Series(
         np.where(df.isMdwarf, np_m, np_fgk), name='Nplanets')
 
     starID = 0  # ???
-    newDF, starID = simfuncs.make_allplanets_df_vec_extrap(df, starID)
+    newDF, starID = simfuncs.make_allplanets_df_vec_extrap(df, starID, rng=rng)
     newDF = newDF.assign(T0=pd.Series(
-        uniform(0, 1, size=newDF.shape[0]) * newDF.loc[:, 'planetPeriod']))
+        rng.uniform(0, 1, size=newDF.shape[0]) * newDF.loc[:, 'planetPeriod']))
 
     newDF['ars'] = simfuncs.per2ars(
         newDF.planetPeriod, newDF.MASS, newDF.RADIUS)
     # ecc dist from Van Eylen 2015
     newDF['ecc'] = pd.Series(
-        beta(1.03, 13.6, size=newDF.shape[0]), name='ecc', )
+        rng.beta(1.03, 13.6, size=newDF.shape[0]), name='ecc', )
     newDF['omega'] = pd.Series(
-        uniform(-np.pi, np.pi, size=newDF.shape[0]), name='omega')
+        rng.uniform(-np.pi, np.pi, size=newDF.shape[0]), name='omega')
     newDF['rprs'] = simfuncs.get_rprs(newDF.planetRadius, newDF.RADIUS)
     newDF['impact'] = newDF.cosi * newDF.ars * \
         ((1 - newDF.ecc**2) / 1 + newDF.ecc * np.sin(newDF.omega))  # cite Winn
@@ -207,49 +158,35 @@ def calculate_planet_properties(df):
     return newDF
 
 
-def get_ntransits(row, sectorlength=13.7, nsectors=114):
-    totalMissionDuration = sectorlength * nsectors
-    transitTimes = np.arange(
-        row.loc['T0'], totalMissionDuration, row.loc['planetPeriod'])
-    bins = sectorlength * np.arange(0, 1 + nsectors)
-    inds = np.digitize(transitTimes, bins=bins, right=True)
-    inds = inds[inds < nsectors + 1]  # assuming we go 4 years and 5 months
-    return np.count_nonzero(inds * row.loc[[str(x) for x in inds]])
-
-
-def get_ntransits_primary(row, sectorlength=13.7, nsectors=114):
-    totalMissionDuration = sectorlength * nsectors
-    transitTimes = np.arange(
-        row.loc['T0'], totalMissionDuration, row.loc['planetPeriod'])
-    if sectorlength < 20:
-        bins = sectorlength * np.arange(0, 1 + (26 * 2))
-        inds = np.digitize(transitTimes, bins=bins, right=True)
-        inds = inds[inds < 1 + (26 * 2)]
-    else:
-        bins = sectorlength * np.arange(0, 1 + (13 * 2))
-        inds = np.digitize(transitTimes, bins=bins, right=True)
-        inds = inds[inds < 1 + (13 * 2)]
-    return np.count_nonzero(inds * row.loc[[str(x) for x in inds]])
-
-
 def get_insol(teff, ars):
     p1 = (teff / 5771)**4
     p2 = (215.1 / ars)**2
     return p1 * p2
 
 
-def make_output_arr(dfx, nsectors):
+def make_output_arr(dfx, coverage, timeline=None):
+    """
+    coverage is the SectorCoverage of each row of dfx. timeline is the
+    MissionTimeline of its sectors, e.g. from get_timeline; without one,
+    sectors are back to back and consts['sector_length'] long.
+    """
     # which stars are observed
-    obscols = [str(x) for x in range(1, nsectors + 1)]
-    dfx.loc[:, 'isObserved'] = dfx.loc[:, obscols].sum(axis=1) > 0
+    dfx.loc[:, 'isObserved'] = coverage.any()
 
     # how many observed transits
-    # this line takes several minutes
-    dfx.loc[:, 'Ntransits'] = dfx.progress_apply(get_ntransits, axis=1)
+    dfx.loc[:, 'Ntransits'] = simfuncs.count_transits(
+        dfx.T0.values, dfx.planetPeriod.values, coverage,
+        sectorlength=consts['sector_length'], timeline=timeline)
 
     # how many observed transits in the primary mission
-    dfx.loc[:, 'Ntransits_primary'] = dfx.progress_apply(
-        get_ntransits_primary, axis=1)
+    if consts['sector_length'] < 20:
+        nprimary = 26 * 2
+    else:
+        nprimary = 13 * 2
+    dfx.loc[:, 'Ntransits_primary'] = simfuncs.count_transits(
+        dfx.T0.values, dfx.planetPeriod.values, coverage,
+        sectorlength=consts['sector_length'], nsectors=nprimary,
+        timeline=timeline)
 
     # get SNR
     dfx.loc[:, 'SNR'] = (dfx.transit_depth_diluted * dfx.duration_correction *
@@ -299,27 +236,22 @@ if __name__ == '__main__':
     selected.to_csv('../data/allCTL8-EM-{}-{}T.csv.bz2'.format(consts['version'], consts['detect_transits']),
                     compression='bz2')
 
-    out_SNE = get_camera_bouma(selected.reset_index(
-        drop=True), fieldfile='../data/camera_boresights_SNE-shifted.csv')
-    # out_SNSNS = get_camera_bouma(selected.reset_index(
-    #     drop=True), fieldfile='../data/camera_boresights_SNSNS.csv')
-    # out_SNNSN = get_camera_bouma(selected.reset_index(
-    #     drop=True), fieldfile='../data/camera_boresights_SNNSN.csv')
-    # out_EC3PO = get_camera_bouma(selected.reset_index(
-    #     drop=True), fieldfile='../data/camera_boresights_EC3PO.csv')
-
-    df_out_SNE = pd.DataFrame(out_SNE, columns=[str(
-        x) for x in range(1, 1 + out_SNE.shape[1])])
-    # df_out_SNSNS = pd.DataFrame(
-    #     out_SNSNS, columns=[str(x) for x in range(1, 1 + out_SNE.shape[1])])
-    # df_out_SNNSN = pd.DataFrame(
-    #     out_SNNSN, columns=[str(x) for x in range(1, 1 + out_SNE.shape[1])])
-    # df_out_EC3PO = pd.DataFrame(
-    #     out_EC3PO, columns=[str(x) for x in range(1, 1 + out_SNE.shape[1])])
-
-    dfw_SNE = pd.concat([selected.reset_index(drop=True), df_out_SNE], axis=1)
-    nsectors = out_SNE.shape[1]
-    dfw_SNE = make_output_arr(dfw_SNE, nsectors)
+    out_SNE = get_planet_coverage(
+        df, selected.starID.values,
+        fieldfile='../data/camera_boresights_SNE-shifted.csv')
+    timeline_SNE = get_timeline('../data/camera_boresights_SNE-shifted.csv')
+    # out_SNSNS = get_planet_coverage(
+    #     df, selected.starID.values,
+    #     fieldfile='../data/camera_boresights_SNSNS.csv')
+    # out_SNNSN = get_planet_coverage(
+    #     df, selected.starID.values,
+    #     fieldfile='../data/camera_boresights_SNNSN.csv')
+    # out_EC3PO = get_planet_coverage(
+    #     df, selected.starID.values,
+    #     fieldfile='../data/camera_boresights_EC3PO.csv')
+
+    dfw_SNE = make_output_arr(
+        selected.reset_index(drop=True), out_SNE, timeline=timeline_SNE)
     print('Planets detected in primary + extended mission SNE: {}'.format(
         dfw_SNE[dfw_SNE.detected].shape[0]))
     print('Planets detected in primary mission SNE: {}'.format(
@@ -327,10 +259,8 @@ if __name__ == '__main__':
     dfw_SNE.to_csv('../data/obs_SNE-{}-{}T-CTL8.csv.bz2'.format(consts['version'], consts['detect_transits']),
                    compression='bz2')
 
-    # dfw_SNSNS = pd.concat(
-    #     [selected.reset_index(drop=True), df_out_SNSNS], axis=1)
-    # nsectors = out_SNSNS.shape[1]
-    # dfw_SNSNS = make_output_arr(dfw_SNSNS, nsectors)
+    # dfw_SNSNS = make_output_arr(
+    #     selected.reset_index(drop=True), out_SNSNS)
     # print('Planets detected in primary + extended mission SNSNS: {}'.format(
     #     dfw_SNSNS[dfw_SNSNS.detected].shape[0]))
     # print('Planets detected in primary mission SNSNS: {}'.format(
@@ -338,10 +268,8 @@ if __name__ == '__main__':
     # dfw_SNSNS.to_csv('../data/obs_SNSNS-{}-{}T.csv.bz2'.format(consts['version'], consts['detect_transits']),
     #                  compression='bz2')
 
-    # dfw_SNNSN = pd.concat(
-    #     [selected.reset_index(drop=True), df_out_SNNSN], axis=1)
-    # nsectors = out_SNNSN.shape[1]
-    # dfw_SNNSN = make_output_arr(dfw_SNNSN, nsectors)
+    # dfw_SNNSN = make_output_arr(
+    #     selected.reset_index(drop=True), out_SNNSN)
     # print('Planets detected in primary + extended mission SNNSN: {}'.format(
     #     dfw_SNNSN[dfw_SNNSN.detected].shape[0]))
     # print('Planets detected in primary mission SNNSN: {}'.format(
@@ -349,10 +277,8 @@ if __name__ == '__main__':
     # dfw_SNNSN.to_csv('../data/obs_SNNSN-{}-{}T.csv.bz2'.format(consts['version'], consts['detect_transits']),
     #                  compression='bz2')
 
-    # dfw_EC3PO = pd.concat(
-    #     [selected.reset_index(drop=True), df_out_EC3PO], axis=1)
-    # nsectors = out_EC3PO.shape[1]
-    # dfw_EC3PO = make_output_arr(dfw_EC3PO, nsectors)
+    # dfw_EC3PO = make_output_arr(
+    #     selected.reset_index(drop=True), out_EC3PO)
     # print('Planets detected in primary + extended mission EC3PO: {}'.format(
     #     dfw_EC3PO[dfw_EC3PO.detected].shape[0]))
     # print('Planets detected in primary mission EC3PO: {}'.format(
@@ -9,6 +9,9 @@ from astropy import units as u
 from numpy.random import poisson, beta, uniform
 from numpy import array as nparr
 import simfuncs
+from sector_coverage import SectorCoverage
+from make_catalog import detectable, _candidate_coverage, _fill_candidates
+from summaries import MonteCarloSummary, CountReduction, HistogramReduction
 
 tqdm.pandas()
 
@@ -20,6 +23,9 @@ consts = {
     # "fgk_rate": 2.5,#0.69,#2.5,
     "m_rate": 2.96,
     "ocrMeasurement": "burke",
+    # per-planet csv files are written for this many of the trials; the
+    # rest only go into the summary
+    "write_trials": 10,
 }
 
 if consts['ocrMeasurement'] == 'bryson':
@@ -30,6 +36,18 @@ elif consts['ocrMeasurement'] == 'LUVOIR':
     consts['fgk_rate'] = 0.05
 
 
+# what is kept of every trial, see summaries.MonteCarloSummary
+SUMMARY_REDUCTIONS = {
+    "detected_primary": CountReduction("detected_primary"),
+    "detected": CountReduction("detected"),
+    "detected_primary_inZetaEarth": CountReduction("detected_primary", "inZetaEarth"),
+    "detected_inZetaEarth": CountReduction("detected", "inZetaEarth"),
+    "detected_primary_inOptimisticHZ": CountReduction("detected_primary", "inOptimisticHZ"),
+    "detected_inOptimisticHZ": CountReduction("detected", "inOptimisticHZ"),
+    "detected_period_radius": HistogramReduction("detected"),
+}
+
+
 def get_quarters(strategy="k1k2"):
     # arrary runs from Q1 2009 - Q4 2031
     quartersObserved = np.zeros(4 * 22)
@@ -45,28 +63,84 @@ def get_quarters(strategy="k1k2"):
     return quartersObserved
 
 
-def calculate_planet_properties(df):
+def calculate_planet_properties(df, rng=np.random):
     df["isMdwarf"] = np.where((df.teff < 3900) & (df.radius < 0.6), True, False)
     df["isGiant"] = np.zeros(df.shape[0], dtype="bool")  # assume all dwarfs
 
-    df["cosi"] = pd.Series(np.random.random(size=df.shape[0]), name="cosi")
+    df["cosi"] = pd.Series(rng.random(size=df.shape[0]), name="cosi")
     df["noise_level"] = simfuncs.kepler_noise_1h_quiet(df.kepmag)
 
-    np_fgk = poisson(lam=consts["fgk_rate"], size=df.shape[0])
+    np_fgk = rng.poisson(lam=consts["fgk_rate"], size=df.shape[0])
     if consts['ocrMeasurement'] == 'LUVOIR':
         np_fgk = np.where((df.teff > 5300) & (df.teff < 6000), np_fgk, 0)
-    np_m = poisson(lam=consts["m_rate"], size=df.shape[0])
+    np_m = rng.poisson(lam=consts["m_rate"], size=df.shape[0])
     df["Nplanets"] = pd.Series(
         np.where(df.isMdwarf, np_m, np_fgk), name="Nplanets"
     )
 
     starID = 0  # ???
     newDF, starID = simfuncs.make_allplanets_df_vec_extrap_kepler(
-        df, starID, ocrMeasurement=consts["ocrMeasurement"]
+        df, starID, ocrMeasurement=consts["ocrMeasurement"], rng=rng
+    )
+    return add_planet_properties(newDF, rng=rng)
+
+
+def prepare_stars(df):
+    """
+    a copy of the star table with the star properties that are the same in
+    every trial worked out once: isMdwarf, isGiant and noise_level
+    """
+    stars = df.copy()
+    stars["isMdwarf"] = np.where(
+        (stars.teff < 3900) & (stars.radius < 0.6), True, False
+    )
+    stars["isGiant"] = np.zeros(stars.shape[0], dtype="bool")  # assume all dwarfs
+    stars["noise_level"] = simfuncs.kepler_noise_1h_quiet(stars.kepmag)
+    return stars
+
+
+def calculate_planet_properties_batch(stars, nrealizations, rng=np.random):
+    """
+    calculate_planet_properties for nrealizations realizations of the stars
+    in one vectorized pass. Returns the planets of all of them, with a
+    "realization" column (0 to nrealizations - 1); starID is the host's row
+    in stars. With nrealizations=1 the draws, and so the planets, are the
+    same as calculate_planet_properties.
+
+    stars, from prepare_stars, is only read: cosi and the planet counts are
+    overlaid on the planets, so trials can share one star table.
+    """
+    if not {"isMdwarf", "isGiant", "noise_level"} <= set(stars.columns):
+        stars = prepare_stars(stars)
+    shape = (nrealizations, stars.shape[0])
+    isMdwarf = stars.isMdwarf.values
+
+    cosi = rng.random(size=shape)
+
+    np_fgk = rng.poisson(lam=consts["fgk_rate"], size=shape)
+    if consts['ocrMeasurement'] == 'LUVOIR':
+        np_fgk = np.where(((stars.teff > 5300) & (stars.teff < 6000)).values, np_fgk, 0)
+    np_m = rng.poisson(lam=consts["m_rate"], size=shape)
+    nplanets = np.where(isMdwarf, np_m, np_fgk)
+
+    newDF = simfuncs.make_allplanets_df_batch(
+        stars,
+        nplanets,
+        overlays={"cosi": cosi},
+        fgk_model=simfuncs.occurrence_model_name(consts["ocrMeasurement"]),
+        rng=rng,
     )
+    return add_planet_properties(newDF, rng=rng)
+
+
+def add_planet_properties(newDF, rng=np.random):
+    """
+    draw the orbits of the planets from make_allplanets_df_vec_extrap_kepler
+    and work out their transit properties
+    """
     newDF = newDF.assign(
         T0=pd.Series(
-            uniform(0, 1, size=newDF.shape[0]) * newDF.loc[:, "planetPeriod"]
+            rng.uniform(0, 1, size=newDF.shape[0]) * newDF.loc[:, "planetPeriod"]
         )
     )
 
@@ -74,9 +148,9 @@ def calculate_planet_properties(df):
         newDF.planetPeriod, newDF.mass, newDF.radius
     )
     # ecc dist from Van Eylen 2015
-    newDF["ecc"] = pd.Series(beta(1.03, 13.6, size=newDF.shape[0]), name="ecc")
+    newDF["ecc"] = pd.Series(rng.beta(1.03, 13.6, size=newDF.shape[0]), name="ecc")
     newDF["omega"] = pd.Series(
-        uniform(-np.pi, np.pi, size=newDF.shape[0]), name="omega"
+        rng.uniform(-np.pi, np.pi, size=newDF.shape[0]), name="omega"
     )
     newDF["rprs"] = simfuncs.get_rprs(newDF.planetRadius, newDF.radius)
     newDF["impact"] = (
@@ -107,48 +181,48 @@ def calculate_planet_properties(df):
     return newDF
 
 
-def get_ntransits(row, sectorlength=91.3125, nsectors=88):
-    totalMissionDuration = sectorlength * nsectors
-    transitTimes = np.arange(
-        row.loc["T0"], totalMissionDuration, row.loc["planetPeriod"]
-    )
-    bins = sectorlength * np.arange(0, 1 + nsectors)
-    inds = np.digitize(transitTimes, bins=bins, right=True)
-    inds = inds[inds < nsectors + 1]  
-    return np.count_nonzero(inds * row.loc[[str(x) for x in inds]])
-
-
-def get_ntransits_primary(row, sectorlength=91.3125, nsectors=88):
-    totalMissionDuration = sectorlength * nsectors
-    transitTimes = np.arange(
-        row.loc["T0"], totalMissionDuration, row.loc["planetPeriod"]
-    )
-
-    bins = sectorlength * np.arange(1, 1 + 16 + 1)
-    inds = np.digitize(transitTimes, bins=bins, right=True)
-    inds = inds[inds < 1 + 16 ]
-    return np.count_nonzero(inds * row.loc[[str(x) for x in inds]])
-
-
 def get_insol(teff, ars):
     p1 = (teff / 5771) ** 4
     p2 = (215.1 / ars) ** 2
     return p1 * p2
 
 
-def make_output_arr(dfx, nsectors):
+def make_output_arr(dfx, coverage, candidates=None):
+    """
+    coverage is the SectorCoverage of each row of dfx.
+
+    With candidates, a boolean mask over dfx such as from detectable(), only
+    the transits of the candidate rows are counted. The other rows can't be
+    detected: they get detected False and 0 for the transit counts and the
+    SNRs.
+    """
     # which stars are observed
-    obscols = [str(x) for x in range(1, nsectors + 1)]
-    dfx.loc[:, "isObserved"] = dfx.loc[:, obscols].sum(axis=1) > 0
+    dfx.loc[:, "isObserved"] = coverage.any()
 
-    # how many observed transits
-    # this line takes several minutes
-    dfx.loc[:, "Ntransits"] = dfx.progress_apply(get_ntransits, axis=1)
+    candidates, coverage = _candidate_coverage(coverage, candidates)
+    T0 = dfx.T0.values[candidates]
+    period = dfx.planetPeriod.values[candidates]
 
-    # how many observed transits in the primary mission
-    dfx.loc[:, "Ntransits_primary"] = dfx.progress_apply(
-        get_ntransits_primary, axis=1
+    # how many observed transits
+    ntransits = simfuncs.count_transits(
+        T0,
+        period,
+        coverage,
+        sectorlength=consts["sector_length"],
+    )
+    dfx.loc[:, "Ntransits"] = _fill_candidates(ntransits, candidates)
+
+    # how many observed transits in the primary mission, quarters 1-16.
+    # these have always been binned one quarter later than above
+    ntransits = simfuncs.count_transits(
+        T0,
+        period,
+        coverage,
+        sectorlength=consts["sector_length"],
+        first_sector=1,
+        nsectors=16,
     )
+    dfx.loc[:, "Ntransits_primary"] = _fill_candidates(ntransits, candidates)
 
     # get SNR
     dfx.loc[:, "SNR"] = (
@@ -250,15 +324,8 @@ if __name__ == "__main__":
             consts["version"], consts["detect_transits"], consts["ocrMeasurement"],
         )
     )
-    out_kepler = np.tile(get_quarters(), [selected.shape[0], 1])
-    df_out_kepler = pd.DataFrame(
-        out_kepler, columns=[str(x) for x in range(1, 1 + out_kepler.shape[1])]
-    )
-    dfw_kepler = pd.concat(
-        [selected.reset_index(drop=True), df_out_kepler], axis=1
-    )
-    nsectors = out_kepler.shape[1]
-    dfw_kepler = make_output_arr(dfw_kepler, nsectors)
+    out_kepler = SectorCoverage.tile(get_quarters(), selected.shape[0])
+    dfw_kepler = make_output_arr(selected.reset_index(drop=True), out_kepler)
 
     print(
         "Planets detected in primary + extended mission: {}".format(
@@ -276,56 +343,39 @@ if __name__ == "__main__":
         )
     )
 
-    q1 = np.array([])
-    q2 = np.array([])
-    q3 = np.array([])
-    q4 = np.array([])
-    q5 = np.array([])
-    q6 = np.array([])
-    for i in trange(500):
-        newDF = calculate_planet_properties(df)
-
-        selected = newDF[newDF.has_transits == True]
-        out_kepler = np.tile(get_quarters(), [selected.shape[0], 1])
-        df_out_kepler = pd.DataFrame(
-            out_kepler,
-            columns=[str(x) for x in range(1, 1 + out_kepler.shape[1])],
-        )
-        dfw_kepler = pd.concat(
-            [selected.reset_index(drop=True), df_out_kepler], axis=1
-        )
-        nsectors = out_kepler.shape[1]
-        dfw_kepler = make_output_arr(dfw_kepler, nsectors)
-
-        q1 = np.r_[q1, dfw_kepler[dfw_kepler.detected_primary].shape[0]]
-        q2 = np.r_[q2, dfw_kepler[dfw_kepler.detected].shape[0]]
-
-        q3 = np.r_[
-            q3,
-            dfw_kepler[
-                dfw_kepler.detected_primary & (dfw_kepler.inZetaEarth)
-            ].shape[0],
-        ]
-        q4 = np.r_[
-            q4,
-            dfw_kepler[(dfw_kepler.detected) & (dfw_kepler.inZetaEarth)].shape[
-                0
-            ],
-        ]
-
-        # q5 = np.r_[
-        #     q5,
-        #     dfw_kepler[
-        #         dfw_kepler.detected_primary & (dfw_kepler.inSAG13)
-        #     ].shape[0],
-        # ]
-        # q6 = np.r_[
-        #     q6,
-        #     dfw_kepler[(dfw_kepler.detected) & (dfw_kepler.inSAG13)].shape[0],
-        # ]
-
-        dfw_kepler.to_csv(
-        "../data/bryson/{}/obs_kepler-{}-{}T-{}-n{}.csv".format(consts["ocrMeasurement"],
-        consts["version"], consts["detect_transits"], consts["ocrMeasurement"],
-        i)
+    # the 500 trials, batchsize realizations per vectorized pass
+    ntrials = 500
+    batchsize = 10
+    summary = MonteCarloSummary(SUMMARY_REDUCTIONS, ntrials)
+    stars = prepare_stars(df)
+    for start in trange(0, ntrials, batchsize):
+        nbatch = min(batchsize, ntrials - start)
+        newDF = calculate_planet_properties_batch(stars, nbatch)
+
+        selected = newDF[newDF.has_transits == True].reset_index(drop=True)
+        # only planets that could be detected in every quarter are counted
+        quarters = get_quarters()
+        candidates = detectable(
+            selected,
+            len(quarters),
+            sectorlength=consts["sector_length"],
+            sigma_threshold=consts["sigma_threshold"],
+            detect_transits=consts["detect_transits"],
         )
+        out_kepler = SectorCoverage.tile(quarters, selected.shape[0])
+        dfw_kepler = make_output_arr(selected, out_kepler, candidates)
+        summary.add(dfw_kepler, range(start, start + nbatch))
+
+        realization = dfw_kepler.realization.values
+        for r in range(min(nbatch, consts["write_trials"] - start)):
+            dfw_trial = dfw_kepler[realization == r]
+            dfw_trial.reset_index(drop=True).to_csv(
+            "../data/bryson/{}/obs_kepler-{}-{}T-{}-n{}.csv".format(consts["ocrMeasurement"],
+            consts["version"], consts["detect_transits"], consts["ocrMeasurement"],
+            start + r)
+            )
+
+    summary.save(
+        "../data/bryson/{}/summary_kepler-{}-{}T-{}.npz".format(consts["ocrMeasurement"],
+        consts["version"], consts["detect_transits"], consts["ocrMeasurement"])
+    )
@@ -0,0 +1,157 @@
+import hashlib
+import os
+
+import numpy as np
+
+
+def popcount(words):
+    """
+    number of set bits in each element of a uint64 array
+    """
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words)
+    # numpy < 2.0: count bits a byte at a time
+    table = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+    nbytes = table[words.view(np.uint8)].reshape(words.shape + (8,))
+    return nbytes.sum(axis=-1, dtype=np.uint8)
+
+
+class SectorCoverage(object):
+    """
+    Which sectors (or orbits, or Kepler quarters) each star or planet is
+    observed in, packed one bit per sector into uint64 words.
+
+    Sector k (counting from 0, i.e. DataFrame column str(k + 1) in the old
+    wide layout) is bit k % 64 of word k // 64. A 114-orbit TESS schedule is
+    two words, 16 bytes, per row instead of 114 int64 columns.
+    """
+
+    def __init__(self, words, nsectors):
+        self.words = np.asarray(words, dtype="<u8")
+        self.nsectors = nsectors
+
+    @staticmethod
+    def nwords(nsectors):
+        return (nsectors + 63) // 64
+
+    @classmethod
+    def from_dense(cls, observed, chunksize=1000000):
+        """
+        pack a (row x sector) array, nonzero where observed
+        """
+        observed = np.asarray(observed)
+        nrows, nsectors = observed.shape
+        words = np.zeros((nrows, cls.nwords(nsectors)), dtype="<u8")
+        wbytes = words.view(np.uint8)
+        for start in range(0, nrows, chunksize):
+            sl = slice(start, start + chunksize)
+            packed = np.packbits(observed[sl] != 0, axis=1, bitorder="little")
+            wbytes[sl, : packed.shape[1]] = packed
+        return cls(words, nsectors)
+
+    @classmethod
+    def tile(cls, observed, nrows):
+        """
+        every one of nrows rows observed in the same sectors, e.g. Kepler's
+        quarters from get_quarters()
+        """
+        row = cls.from_dense(np.asarray(observed).reshape(1, -1))
+        return cls(np.repeat(row.words, nrows, axis=0), row.nsectors)
+
+    def __len__(self):
+        return self.words.shape[0]
+
+    def sector_mask(self, sectors=None):
+        """
+        words with the bits of the given sectors (an index, slice or boolean
+        array over sectors) set, e.g. sector_mask(slice(0, 52)) for the TESS
+        primary mission
+        """
+        bits = np.zeros(self.nsectors, dtype=bool)
+        if sectors is None:
+            bits[:] = True
+        else:
+            bits[sectors] = True
+        return SectorCoverage.from_dense(bits.reshape(1, -1)).words[0]
+
+    def _masked(self, sectors):
+        if sectors is None:
+            return self.words
+        return self.words & self.sector_mask(sectors)
+
+    def count(self, sectors=None):
+        """
+        number of (the given) sectors each row is observed in
+        """
+        return popcount(self._masked(sectors)).sum(axis=1, dtype=np.int64)
+
+    def any(self, sectors=None):
+        return (self._masked(sectors) != 0).any(axis=1)
+
+    def all(self, sectors=None):
+        mask = self.sector_mask(sectors)
+        return ((self.words & mask) == mask).all(axis=1)
+
+    def take(self, indices):
+        """
+        coverage for the given rows, e.g. broadcast star coverage to planets
+        """
+        return SectorCoverage(self.words[indices], self.nsectors)
+
+    def to_dense(self, rows=slice(None), sectors=None):
+        """
+        unpack (the given rows of) the coverage to a boolean (row x sector)
+        array
+        """
+        wbytes = self.words[rows].view(np.uint8)
+        dense = np.unpackbits(wbytes, axis=1, count=self.nsectors,
+                              bitorder="little").view(bool)
+        if sectors is not None:
+            dense = dense[:, sectors]
+        return dense
+
+
+def coverage_cache_key(elon, elat, fieldfile):
+    """
+    content hash of the star coordinates that are projected (ecliptic
+    longitude and latitude) and the boresight file, so a cached coverage is
+    only reused for exactly the same (catalog, strategy) pair
+    """
+    h = hashlib.sha1()
+    h.update(np.ascontiguousarray(elon, dtype=np.float64).tobytes())
+    h.update(np.ascontiguousarray(elat, dtype=np.float64).tobytes())
+    with open(fieldfile, "rb") as f:
+        h.update(f.read())
+    return h.hexdigest()
+
+
+def atomic_save(fn, save):
+    """
+    calls save with a file open for writing, e.g. lambda f: np.save(f, a),
+    and only then puts that file at fn, so an interrupted run never leaves
+    a partial one there
+    """
+    tmpfile = "{}.{}.tmp".format(fn, os.getpid())
+    try:
+        with open(tmpfile, "wb") as f:
+            save(f)
+        os.replace(tmpfile, fn)
+    finally:
+        if os.path.exists(tmpfile):
+            os.remove(tmpfile)
+
+
+def cached_coverage(cachefile, nsectors, compute):
+    """
+    returns the SectorCoverage saved in cachefile, memory-mapped rather than
+    read, or if there is no such file calls compute() and saves its result
+    there for next time
+    """
+    if os.path.exists(cachefile):
+        return SectorCoverage(np.load(cachefile, mmap_mode="r"), nsectors)
+    coverage = compute()
+    cachedir = os.path.dirname(cachefile)
+    if cachedir and not os.path.isdir(cachedir):
+        os.makedirs(cachedir)
+    atomic_save(cachefile, lambda f: np.save(f, coverage.words))
+    return coverage
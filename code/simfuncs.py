@@ -1,897 +1,358 @@
+import abc
+
 import numpy as np
-from numpy import random
-from scipy.interpolate import interp1d
 import pandas as pd
 
+import kernels
+from sector_coverage import SectorCoverage
+from timeline import MissionTimeline
+
 msun = 1.9891e30
 rsun = 695500000.0
 G = 6.67384e-11
 AU = 149597870700.0
 
 
-def component_noise(tessmag, readmod=1, zodimod=1):
-    sys = 59.785
-    star_mag_level, star_noise_level = np.array(
-        [
-            [4.3885191347753745, 12.090570910640581],
-            [12.023294509151416, 467.96434635620614],
-            [17.753743760399338, 7779.603209291808],
-        ]
-    ).T
-    star_pars = np.polyfit(star_mag_level, np.log10(star_noise_level), 1)
-    zodi_mag_level, zodi_noise_level = np.array(
-        [
-            [8.686356073211314, 18.112513551189224],
-            [13.08901830282862, 688.2812796087189],
-            [16.68801996672213, 19493.670323892282],
-        ]
-    ).T
-    zodi_pars = np.polyfit(zodi_mag_level, np.log10(zodi_noise_level), 1)
-    read_mag_level, read_noise_level = np.array(
-        [
-            [8.476705490848586, 12.31474807751376],
-            [13.019134775374376, 522.4985702369348],
-            [17.841098169717142, 46226.777232915076],
-        ]
-    ).T
-    read_pars = np.polyfit(read_mag_level, np.log10(read_noise_level), 1)
-
-    c1, c2, c3, c4 = (
-        10 ** (tessmag * star_pars[0] + star_pars[1]),
-        10 ** (tessmag * zodi_pars[0] + zodi_pars[1]),
-        10 ** (tessmag * read_pars[0] + read_pars[1]),
-        sys,
-    )
+class NoiseModel(abc.ABC):
+    """
+    Base class for the photometric noise models. Subclasses do whatever
+    fitting or table building they need once, in __init__, and implement
+    evaluate() as a vectorized expression of the magnitude.
+
+    Calling the model evaluates it chunksize stars at a time into a single
+    preallocated output array, so a very large catalog never needs more
+    than a chunk's worth of temporaries. The output has the float type of
+    the input magnitudes (float64 for anything that is not float32). Array
+    keyword arguments are broadcast against the magnitudes and chunked with
+    them.
+    """
 
-    return np.sqrt(
-        c1 ** 2 + (readmod * c2) ** 2 + (zodimod * c3) ** 2 + c4 ** 2
-    )
+    chunksize = 1000000
+
+    def __call__(self, mag, chunksize=None, **kwargs):
+        mag = np.asarray(mag)
+        dtype = np.float32 if mag.dtype == np.float32 else np.float64
+        mag = mag.astype(dtype, copy=False)
+        if chunksize is None:
+            chunksize = self.chunksize
+        out = np.empty(mag.shape, dtype=dtype)
+        flat_mag, flat_out = mag.reshape(-1), out.reshape(-1)
+        arrays = {}
+        for key, value in list(kwargs.items()):
+            if np.ndim(value):
+                arrays[key] = np.broadcast_to(value, mag.shape).reshape(-1)
+                del kwargs[key]
+        for start in range(0, flat_mag.shape[0], chunksize):
+            sl = slice(start, start + chunksize)
+            for key, value in arrays.items():
+                kwargs[key] = value[sl]
+            flat_out[sl] = self.evaluate(flat_mag[sl], **kwargs)
+        return out
+
+    @abc.abstractmethod
+    def evaluate(self, mag, **kwargs):
+        """
+        the noise at each of mag, a 1-d chunk of the magnitudes
+        """
+
+
+class ComponentNoise(NoiseModel):
+    """
+    Noise as the quadrature sum of star, zodi and read noise, each a power
+    law in magnitude fit through three (mag, noise) points, plus a
+    systematic floor.
+    """
+
+    def __init__(self, star_levels, zodi_levels, read_levels, sys):
+        self.star_pars = self._fit(star_levels)
+        self.zodi_pars = self._fit(zodi_levels)
+        self.read_pars = self._fit(read_levels)
+        self.sys = sys
 
+    @staticmethod
+    def _fit(levels):
+        mag_level, noise_level = np.array(levels).T
+        return np.polyfit(mag_level, np.log10(noise_level), 1)
 
-def rndm(a, b, g, size=1):
+    def evaluate(self, mag, readmod=1, zodimod=1):
+        # (10 ** (m * a + b)) ** 2 == 10 ** (2 * (m * a + b)), so square
+        # terms are built directly and summed in place
+        out = 10 ** (2 * (mag * self.star_pars[0] + self.star_pars[1]))
+        out += readmod ** 2 * 10 ** (2 * (mag * self.zodi_pars[0] + self.zodi_pars[1]))
+        out += zodimod ** 2 * 10 ** (2 * (mag * self.read_pars[0] + self.read_pars[1]))
+        out += self.sys ** 2
+        return np.sqrt(out, out=out)
+
+
+class InterpolatedNoise(NoiseModel):
+    """
+    Noise linearly interpolated in a (mag, noise) table, and extrapolated
+    along the first and last segments, times a constant scale.
+    """
+
+    def __init__(self, levels, scale=1.0):
+        self.mag_level, self.noise_level = np.array(levels).T
+        self.scale = scale
+        self.slope_low = (self.noise_level[1] - self.noise_level[0]) / (
+            self.mag_level[1] - self.mag_level[0])
+        self.slope_high = (self.noise_level[-1] - self.noise_level[-2]) / (
+            self.mag_level[-1] - self.mag_level[-2])
+
+    def evaluate(self, mag):
+        out = np.interp(mag, self.mag_level, self.noise_level)
+        low = mag < self.mag_level[0]
+        out[low] = self.noise_level[0] + self.slope_low * (
+            mag[low] - self.mag_level[0])
+        high = mag > self.mag_level[-1]
+        out[high] = self.noise_level[-1] + self.slope_high * (
+            mag[high] - self.mag_level[-1])
+        out *= self.scale
+        return out
+
+
+TESS_NOISE = ComponentNoise(
+    star_levels=[
+        [4.3885191347753745, 12.090570910640581],
+        [12.023294509151416, 467.96434635620614],
+        [17.753743760399338, 7779.603209291808],
+    ],
+    zodi_levels=[
+        [8.686356073211314, 18.112513551189224],
+        [13.08901830282862, 688.2812796087189],
+        [16.68801996672213, 19493.670323892282],
+    ],
+    read_levels=[
+        [8.476705490848586, 12.31474807751376],
+        [13.019134775374376, 522.4985702369348],
+        [17.841098169717142, 46226.777232915076],
+    ],
+    sys=59.785,
+)
+
+
+def component_noise(tessmag, readmod=1, zodimod=1):
+    return TESS_NOISE(tessmag, readmod=readmod, zodimod=zodimod)
+
+
+def rndm(a, b, g, size=1, rng=np.random):
     """Power-law gen for pdf(x)\propto x^{g-1} for a<=x<=b"""
-    r = np.random.random(size=size)
+    r = rng.random(size=size)
     ag, bg = a ** g, b ** g
     return (ag + (bg - ag) * r) ** (1.0 / g)
 
 
-def Fressin13_select_extrap(nselect=1):
-    # create a pot for dressing numbers (balls)
-    balls = np.array([])
-    # pot 1 contains rp=0.8-0.1.25, p=0.8-2
-    p1 = np.zeros(180) + 1
-    # pot 2 contains rp=1.25-2.0, p=0.8-2
-    p2 = np.zeros(170) + 2
-    # pot 3 contains rp=2-4, p=0.8-2
-    p3 = np.zeros(35) + 3
-    # pot 4 contains rp=4-6, p=0.8-2
-    p4 = np.zeros(4) + 4
-    # pot 5 contains rp=6-22, p=0.8-2
-    p5 = np.zeros(15) + 5
-
-    # pot 6 contains rp=0.8-0.1.25, p=2-3.4
-    p6 = np.zeros(610) + 6
-    # pot 7 contains rp=1.25-2.0, p=2-3.4
-    p7 = np.zeros(740) + 7
-    # pot 8 contains rp=2-4, p=2-3.4
-    p8 = np.zeros(180) + 8
-    # pot 9 contains rp=4-6, p=2-3.4
-    p9 = np.zeros(6) + 9
-    # pot 10 contains rp=6-22, p=2-3.4
-    p10 = np.zeros(67) + 10
-
-    # pot 11 contains rp=0.8-0.1.25, p=3.4-5.9
-    p11 = np.zeros(1720) + 11
-    # pot 12 contains rp=1.25-2.0, p=3.4-5.9
-    p12 = np.zeros(1490) + 12
-    # pot 13 contains rp=2-4, p=3.4-5.9
-    p13 = np.zeros(730) + 13
-    # pot 14 contains rp=4-6, p=3.4-5.9
-    p14 = np.zeros(110) + 14
-    # pot 15 contains rp=6-22, p=3.4-5.9
-    p15 = np.zeros(170) + 15
-
-    # pot 16 contains rp=0.8-0.1.25, p=5.9-10
-    p16 = np.zeros(2700) + 16
-    # pot 17 contains rp=1.25-2.0, p=5.9-10
-    p17 = np.zeros(2900) + 17
-    # pot 18 contains rp=2-4, p=5.9-10
-    p18 = np.zeros(1930) + 18
-    # pot 19 contains rp=4-6, p=5.9-10
-    p19 = np.zeros(91) + 19
-    # pot 20 contains rp=6-22, p=5.9-10
-    p20 = np.zeros(180) + 20
-
-    # pot 21 contains rp=0.8-0.1.25, p=10-17
-    p21 = np.zeros(2700) + 21
-    # pot 22 contains rp=1.25-2.0, p=10-17
-    p22 = np.zeros(4300) + 22
-    # pot 23 contains rp=2-4, p=10-17
-    p23 = np.zeros(3670) + 23
-    # pot 24 contains rp=4-6, p=10-17
-    p24 = np.zeros(290) + 24
-    # pot 25 contains rp=6-22, p=10-17
-    p25 = np.zeros(270) + 25
-
-    # pot 26 contains rp=0.8-0.1.25, p=17-29
-    p26 = np.zeros(2930) + 26
-    # pot 27 contains rp=1.25-2.0, p=17-29
-    p27 = np.zeros(4490) + 27
-    # pot 28 contains rp=2-4, p=17-29
-    p28 = np.zeros(5290) + 28
-    # pot 29 contains rp=4-6, p=17-29
-    p29 = np.zeros(320) + 29
-    # pot 30 contains rp=6-22, p=17-29
-    p30 = np.zeros(230) + 30
-
-    # pot 31 contains rp=0.8-0.1.25, p=29-50
-    p31 = np.zeros(4080) + 31
-    # pot 32 contains rp=1.25-2.0, p=29-50
-    p32 = np.zeros(5290) + 32
-    # pot 33 contains rp=2-4, p=29-50
-    p33 = np.zeros(6450) + 33
-    # pot 34 contains rp=4-6, p=29-50
-    p34 = np.zeros(490) + 34
-    # pot 35 contains rp=6-22, p=29-50
-    p35 = np.zeros(350) + 35
-
-    # pot 36 contains rp=0.8-0.1.25, p=50-85
-    p36 = np.zeros(3460) + 36
-    # pot 37 contains rp=1.25-2.0, p=50-85
-    p37 = np.zeros(3660) + 37
-    # pot 38 contains rp=2-4, p=50-85
-    p38 = np.zeros(5250) + 38
-    # pot 39 contains rp=4-6, p=50-85
-    p39 = np.zeros(660) + 39
-    # pot 40 contains rp=6-22, p=50-85
-    p40 = np.zeros(710) + 40
-
-    # pot 36 contains rp=0.8-0.1.25, p=50-85
-    p41 = np.zeros(3460) + 41
-    # pot 37 contains rp=1.25-2.0, p=50-85
-    p42 = np.zeros(3660) + 42
-    # pot 38 contains rp=2-4, p=50-85
-    p43 = np.zeros(5250) + 43
-    # pot 39 contains rp=4-6, p=50-85
-    p44 = np.zeros(660) + 44
-    # pot 40 contains rp=6-22, p=50-85
-    p45 = np.zeros(710) + 45
-
-    # pot 36 contains rp=0.8-0.1.25, p=50-85
-    p46 = np.zeros(3460) + 46
-    # pot 37 contains rp=1.25-2.0, p=50-85
-    p47 = np.zeros(3660) + 47
-    # pot 38 contains rp=2-4, p=50-85
-    p48 = np.zeros(5250) + 48
-    # pot 39 contains rp=4-6, p=50-85
-    p49 = np.zeros(660) + 49
-    # pot 40 contains rp=6-22, p=50-85
-    p50 = np.zeros(710) + 50
-
-    # pot 36 contains rp=0.8-0.1.25, p=50-85
-    p51 = np.zeros(3460) + 51
-    # pot 37 contains rp=1.25-2.0, p=50-85
-    p52 = np.zeros(3660) + 52
-    # pot 38 contains rp=2-4, p=50-85
-    p53 = np.zeros(5250) + 53
-    # pot 39 contains rp=4-6, p=50-85
-    p54 = np.zeros(660) + 54
-    # pot 40 contains rp=6-22, p=50-85
-    p55 = np.zeros(710) + 55
-
-    balls = np.r_[
-        balls,
-        p1,
-        p2,
-        p3,
-        p4,
-        p5,
-        p6,
-        p7,
-        p8,
-        p9,
-        p10,
-        p11,
-        p12,
-        p13,
-        p14,
-        p15,
-        p16,
-        p17,
-        p18,
-        p19,
-        p20,
-        p21,
-        p22,
-        p23,
-        p24,
-        p25,
-        p26,
-        p27,
-        p28,
-        p29,
-        p30,
-        p31,
-        p32,
-        p33,
-        p34,
-        p35,
-        p36,
-        p37,
-        p38,
-        p39,
-        p40,
-        p41,
-        p42,
-        p43,
-        p44,
-        p45,
-        p46,
-        p47,
-        p48,
-        p49,
-        p50,
-        p51,
-        p52,
-        p53,
-        p54,
-        p55,
-    ]
-
-    # lookup for what the balls mean
-    # outputs radlow, radhigh, Plow, Phigh
-    ball_lookup = {
-        0: [0.0, 0.0, 0.0, 0.0],
-        1: [0.8, 1.25, 0.8, 2.0],
-        2: [1.25, 2.0, 0.8, 2.0],
-        3: [2.0, 4.0, 0.8, 2.0],
-        4: [4.0, 6.0, 0.8, 2.0],
-        5: [6.0, 22.0, 0.8, 2.0],
-        6: [0.8, 1.25, 2.0, 3.4],
-        7: [1.25, 2.0, 2.0, 3.4],
-        8: [2.0, 4.0, 2.0, 3.4],
-        9: [4.0, 6.0, 2.0, 3.4],
-        10: [6.0, 22.0, 2.0, 3.4],
-        11: [0.8, 1.25, 3.4, 5.9],
-        12: [1.25, 2.0, 3.4, 5.9],
-        13: [2.0, 4.0, 3.4, 5.9],
-        14: [4.0, 6.0, 3.4, 5.9],
-        15: [6.0, 22.0, 3.4, 5.9],
-        16: [0.8, 1.25, 5.9, 10.0],
-        17: [1.25, 2.0, 5.9, 10.0],
-        18: [2.0, 4.0, 5.9, 10.0],
-        19: [4.0, 6.0, 5.9, 10.0],
-        20: [6.0, 22.0, 5.9, 10.0],
-        21: [0.8, 1.25, 10.0, 17.0],
-        22: [1.25, 2.0, 10.0, 17.0],
-        23: [2.0, 4.0, 10.0, 17.0],
-        24: [4.0, 6.0, 10.0, 17.0],
-        25: [6.0, 22.0, 10.0, 17.0],
-        26: [0.8, 1.25, 17.0, 29.0],
-        27: [1.25, 2.0, 17.0, 29.0],
-        28: [2.0, 4.0, 17.0, 29.0],
-        29: [4.0, 6.0, 17.0, 29.0],
-        30: [6.0, 22.0, 17.0, 29.0],
-        31: [0.8, 1.25, 29.0, 50.0],
-        32: [1.25, 2.0, 29.0, 50.0],
-        33: [2.0, 4.0, 29.0, 50.0],
-        34: [4.0, 6.0, 29.0, 50.0],
-        35: [6.0, 22.0, 29.0, 50.0],
-        36: [0.8, 1.25, 50.0, 85.0],
-        37: [1.25, 2.0, 50.0, 85.0],
-        38: [2.0, 4.0, 50.0, 85.0],
-        39: [4.0, 6.0, 50.0, 85.0],
-        40: [6.0, 22.0, 50.0, 85.0],
-        41: [0.8, 1.25, 50.0, 150.0],
-        42: [1.25, 2.0, 50.0, 150.0],
-        43: [2.0, 4.0, 50.0, 150.0],
-        44: [4.0, 6.0, 50.0, 150.0],
-        45: [6.0, 22.0, 50.0, 150.0],
-        46: [0.8, 1.25, 150.0, 270.0],
-        47: [1.25, 2.0, 150.0, 270.0],
-        48: [2.0, 4.0, 150.0, 270.0],
-        49: [4.0, 6.0, 150.0, 270.0],
-        50: [6.0, 22.0, 150.0, 270.0],
-        51: [0.8, 1.25, 270.0, 480.0],
-        52: [1.25, 2.0, 270.0, 480.0],
-        53: [2.0, 4.0, 270.0, 480.0],
-        54: [4.0, 6.0, 270.0, 480.0],
-        55: [6.0, 22.0, 270.0, 480.0],
-    }
-
-    rsamps = random.choice(balls, size=nselect)
-    radius = np.zeros(nselect)
-    period = np.zeros(nselect)
-    for i, samp in enumerate(rsamps):
-        rl, rh, pl, ph = ball_lookup[samp]
-
-        if samp in [5, 10, 15, 20, 25, 30, 35, 40, 45, 50, 55]:
-            # check for giant planets
-            # if a giant planet than draw power law
-            radius[i] = rndm(6, 22, -1.7)
+class BinnedSampler(object):
+    """
+    Draws (radius, period) pairs from a binned occurrence-rate model.
+
+    This replaces the old "pot of balls" approach: rather than building an
+    array with one entry per ball and calling random.choice on it, the bin
+    weights (the number of balls in each pot) are turned into a Walker alias
+    table once, so each draw costs two uniform numbers regardless of how many
+    bins or balls the model has.
+
+    Giant planet bins (those with a finite giant_index) draw their radius
+    from a power law between giant_radlow and giant_radhigh (see rndm)
+    rather than uniformly in the bin.
+    """
+
+    def __init__(self, weights, radlow, radhigh, plow, phigh,
+                 giant_radlow=None, giant_radhigh=None, giant_index=None):
+        self.weights = np.asarray(weights, dtype=float)
+        self.radlow = np.asarray(radlow, dtype=float)
+        self.radhigh = np.asarray(radhigh, dtype=float)
+        self.plow = np.asarray(plow, dtype=float)
+        self.phigh = np.asarray(phigh, dtype=float)
+        nan = np.full(self.weights.shape[0], np.nan)
+        self.giant_radlow = nan if giant_radlow is None else np.asarray(
+            giant_radlow, dtype=float)
+        self.giant_radhigh = nan if giant_radhigh is None else np.asarray(
+            giant_radhigh, dtype=float)
+        self.giant_index = nan if giant_index is None else np.asarray(
+            giant_index, dtype=float)
+        self.giant = np.isfinite(self.giant_index)
+        self.prob, self.alias = alias_table(self.weights)
+
+    @classmethod
+    def from_files(cls, fn):
+        """
+        reads a table with columns weight, radlow, radhigh, Plow, Phigh and
+        optionally giant_radlow, giant_radhigh, giant_index (blank for bins
+        that are not giant planets)
+        """
+        tab = pd.read_csv(fn, comment="#")
+        kwargs = {}
+        for col in ["giant_radlow", "giant_radhigh", "giant_index"]:
+            if col in tab:
+                kwargs[col] = tab[col].values
+        return cls(tab.weight.values, tab.radlow.values, tab.radhigh.values,
+                   tab.Plow.values, tab.Phigh.values, **kwargs)
+
+    @property
+    def nbins(self):
+        return self.weights.shape[0]
+
+    def draw_bins(self, nselect=1, rng=np.random):
+        u = rng.random(size=nselect) * self.nbins
+        idx = u.astype(np.intp)
+        # guard against u == nbins from rounding
+        np.minimum(idx, self.nbins - 1, out=idx)
+        return np.where(u - idx < self.prob[idx], idx, self.alias[idx])
+
+    def draw(self, nselect=1, rng=np.random):
+        """
+        returns radius, period arrays of length nselect
+        """
+        bins = self.draw_bins(nselect, rng=rng)
+        rl, rh = self.radlow[bins], self.radhigh[bins]
+        radius = rl + (rh - rl) * rng.random(size=nselect)
+        isgiant = self.giant[bins]
+        ngiant = np.count_nonzero(isgiant)
+        if ngiant > 0:
+            gbins = bins[isgiant]
+            radius[isgiant] = rndm(self.giant_radlow[gbins],
+                                   self.giant_radhigh[gbins],
+                                   self.giant_index[gbins], size=ngiant,
+                                   rng=rng)
+        pl, ph = self.plow[bins], self.phigh[bins]
+        period = pl + (ph - pl) * rng.random(size=nselect)
+        return radius, period
+
+
+def alias_table(weights):
+    """
+    Vose's version of the Walker alias method. Returns prob, alias such that
+    drawing a bin i uniformly and keeping it with probability prob[i] (else
+    taking alias[i]) samples bins in proportion to weights.
+    """
+    weights = np.asarray(weights, dtype=float)
+    n = weights.shape[0]
+    scaled = weights * n / weights.sum()
+    prob = np.ones(n)
+    alias = np.arange(n)
+    small = list(np.flatnonzero(scaled < 1.0))
+    large = list(np.flatnonzero(scaled >= 1.0))
+    while small and large:
+        s = small.pop()
+        l = large.pop()
+        prob[s] = scaled[s]
+        alias[s] = l
+        scaled[l] = scaled[l] - (1.0 - scaled[s])
+        if scaled[l] < 1.0:
+            small.append(l)
         else:
-            radius[i] = random.uniform(low=rl, high=rh)
+            large.append(l)
+    # anything left over is 1 to within rounding
+    return prob, alias
 
-        period[i] = random.uniform(low=pl, high=ph)
 
-    return radius, period
+class GridSampler(object):
+    """
+    Draws (radius, period) pairs from an occurrence rate given on a regular
+    grid of cell centres, e.g. the 300 x 300 Bryson et al. grids.
 
+    The grid is flattened into a cumulative distribution once; cells are then
+    picked by inverse-CDF lookup and the radius and period are drawn
+    uniformly within the cell.
+    """
 
-def Dressing15_select_extrap(nselect=1):
+    def __init__(self, grid, radius, period):
+        # grid is indexed [period, radius]
+        grid = np.asarray(grid, dtype=float)
+        self.radius = np.asarray(radius, dtype=float)
+        self.period = np.asarray(period, dtype=float)
+        self.dRadius = self.radius[1] - self.radius[0]
+        self.dPeriod = self.period[1] - self.period[0]
+        expected = (len(self.period), len(self.radius))
+        if grid.shape != expected:
+            raise ValueError(
+                "grid must be indexed [period, radius]: expected shape {}, "
+                "got {}".format(expected, grid.shape))
+        self.nradius = grid.shape[1]
+        cdf = np.cumsum(grid.ravel())
+        self.cdf = cdf / cdf[-1]
+
+    @classmethod
+    def from_files(cls, grid_fn, radius_fn, period_fn):
+        return cls(np.load(grid_fn), np.load(radius_fn), np.load(period_fn))
+
+    def draw(self, nselect=1, rng=np.random):
+        """
+        returns radius, period arrays of length nselect
+        """
+        cells = np.searchsorted(self.cdf, rng.random(size=nselect), side="right")
+        np.minimum(cells, self.cdf.shape[0] - 1, out=cells)
+        i, j = np.divmod(cells, self.nradius)
+        radius = self.radius[j] + self.dRadius * (rng.random(size=nselect) - 0.5)
+        period = self.period[i] + self.dPeriod * (rng.random(size=nselect) - 0.5)
+        return radius, period
+
+
+# registry of occurrence models: name -> (sampler class, data files).
+# Tables are only read, and samplers only built, the first time a model is
+# asked for; after that every draw reuses the cached sampler.
+OCCURRENCE_MODELS = {
+    "Fressin13": (BinnedSampler, ["../data/occurrence/Fressin13.csv"]),
+    "Dressing15": (BinnedSampler, ["../data/occurrence/Dressing15.csv"]),
+    "Petigura18": (BinnedSampler, ["../data/occurrence/Petigura18.csv"]),
+    "LUVOIR": (BinnedSampler, ["../data/occurrence/LUVOIR.csv"]),
+    "Bryson-bryson": (
+        GridSampler,
+        [
+            "../data/bryson/occurrenceGrid_1100_bryson.npy",
+            "../data/bryson/occurrenceRadius_1100.npy",
+            "../data/bryson/occurrencePeriod_1100.npy",
+        ],
+    ),
+    "Bryson-burke": (
+        GridSampler,
+        [
+            "../data/bryson/occurrenceGrid_1100_burke.npy",
+            "../data/bryson/occurrenceRadius_1100.npy",
+            "../data/bryson/occurrencePeriod_1100.npy",
+        ],
+    ),
+}
+
+_SAMPLERS = {}
+
+
+def register_occurrence_model(name, sampler_class, files):
     """
-    period bins = 0.5, 0.91, 1.66, 3.02, 5.49, 10.0, 18.2, 33.1, 60.3, 110., 200.
+    add an occurrence model to the registry, e.g.
+    register_occurrence_model("Hsu19", BinnedSampler,
+                               ["../data/occurrence/Hsu19.csv"])
     """
-    # create a pot for dressing numbers (balls)
-    balls = np.array([])
-    # pot 1 contains rp=0.5-1.0, p=0.5-0.91
-    p1 = np.zeros(400) + 1
-    # pot 2 contains rp=1.0-1.5, p=0.5-0.91
-    p2 = np.zeros(460) + 2
-    # pot 3 contains rp=1.5-2.0, p=0.5-0.91
-    p3 = np.zeros(61) + 3
-    # pot 4 contains rp=2.0-2.5, p=0.5-0.91
-    p4 = np.zeros(2) + 4
-    # pot 5 contains rp=2.5-3.0, p=0.5-0.91
-    p5 = np.zeros(0) + 5
-    # pot 6 contains rp=3.0-3.5, p=0.5-0.91
-    p6 = np.zeros(0) + 6
-    # pot 7 contains rp=3.5-4.0, p=0.5-0.91
-    p7 = np.zeros(0) + 7
-    # pot 1 contains rp=0.5-1.0, p=0.91, 1.66
-    p8 = np.zeros(1500) + 8
-    # pot 2 contains rp=1.0-1.5, p=0.91, 1.66
-    p9 = np.zeros(1400) + 9
-    # pot 3 contains rp=1.5-2.0, p=0.91, 1.66
-    p10 = np.zeros(270) + 10
-    # pot 4 contains rp=2.0-2.5, p=0.91, 1.66
-    p11 = np.zeros(9) + 11
-    # pot 5 contains rp=2.5-3.0, p=0.91, 1.66
-    p12 = np.zeros(4) + 12
-    # pot 6 contains rp=3.0-3.5, p=0.91, 1.66
-    p13 = np.zeros(6) + 13
-    # pot 7 contains rp=3.5-4.0, p=0.91, 1.66
-    p14 = np.zeros(8) + 14
-    # pot 1 contains rp=0.5-1.0, p=1.66, 3.02
-    p15 = np.zeros(4400) + 15
-    # pot 2 contains rp=1.0-1.5, p=1.66, 3.02
-    p16 = np.zeros(3500) + 16
-    # pot 3 contains rp=1.5-2.0, p=1.66, 3.02
-    p17 = np.zeros(1200) + 17
-    # pot 4 contains rp=2.0-2.5, p=1.66, 3.02
-    p18 = np.zeros(420) + 18
-    # pot 5 contains rp=2.5-3.0, p=1.66, 3.02
-    p19 = np.zeros(230) + 19
-    # pot 6 contains rp=3.0-3.5, p=1.66, 3.02
-    p20 = np.zeros(170) + 20
-    # pot 7 contains rp=3.5-4.0, p=1.66, 3.02
-    p21 = np.zeros(180) + 21
-    # pot 1 contains rp=0.5-1.0, p=3.02, 5.49
-    p22 = np.zeros(5500) + 22
-    # pot 2 contains rp=1.0-1.5, p=3.02, 5.49
-    p23 = np.zeros(5700) + 23
-    # pot 3 contains rp=1.5-2.0, p=3.02, 5.49
-    p24 = np.zeros(2500) + 24
-    # pot 4 contains rp=2.0-2.5, p=3.02, 5.49
-    p25 = np.zeros(1800) + 25
-    # pot 5 contains rp=2.5-3.0, p=3.02, 5.49
-    p26 = np.zeros(960) + 26
-    # pot 6 contains rp=3.0-3.5, p=3.02, 5.49
-    p27 = np.zeros(420) + 27
-    # pot 7 contains rp=3.5-4.0, p=3.02, 5.49
-    p28 = np.zeros(180) + 28
-    # pot 1 contains rp=0.5-1.0, p=5.49, 10.0
-    p29 = np.zeros(10000) + 29
-    # pot 2 contains rp=1.0-1.5, p=5.49, 10.0
-    p30 = np.zeros(10000) + 30
-    # pot 3 contains rp=1.5-2.0, p=5.49, 10.0
-    p31 = np.zeros(6700) + 31
-    # pot 4 contains rp=2.0-2.5, p=5.49, 10.0
-    p32 = np.zeros(6400) + 32
-    # pot 5 contains rp=2.5-3.0, p=5.49, 10.0
-    p33 = np.zeros(2700) + 33
-    # pot 6 contains rp=3.0-3.5, p=5.49, 10.0
-    p34 = np.zeros(1100) + 34
-    # pot 7 contains rp=3.5-4.0, p=5.49, 10.0
-    p35 = np.zeros(360) + 35
-    # pot 1 contains rp=0.5-1.0, p=10.0, 18.2
-    p36 = np.zeros(12000) + 36
-    # pot 2 contains rp=1.0-1.5, p=10.0, 18.2
-    p37 = np.zeros(13000) + 37
-    # pot 3 contains rp=1.5-2.0, p=10.0, 18.2
-    p38 = np.zeros(13000) + 38
-    # pot 4 contains rp=2.0-2.5, p=10.0, 18.2
-    p39 = np.zeros(9300) + 39
-    # pot 5 contains rp=2.5-3.0, p=10.0, 18.2
-    p40 = np.zeros(3800) + 40
-    # pot 6 contains rp=3.0-3.5, p=10.0, 18.2
-    p41 = np.zeros(1400) + 41
-    # pot 7 contains rp=3.5-4.0, p=10.0, 18.2
-    p42 = np.zeros(510) + 42
-    # pot 1 contains rp=0.5-1.0, p=18.2, 33.1
-    p43 = np.zeros(11000) + 43
-    # pot 2 contains rp=1.0-1.5, p=18.2, 33.1
-    p44 = np.zeros(16000) + 44
-    # pot 3 contains rp=1.5-2.0, p=18.2, 33.1
-    p45 = np.zeros(14000) + 45
-    # pot 4 contains rp=2.0-2.5, p=18.2, 33.1
-    p46 = np.zeros(10000) + 46
-    # pot 5 contains rp=2.5-3.0, p=18.2, 33.1
-    p47 = np.zeros(4600) + 47
-    # pot 6 contains rp=3.0-3.5, p=18.2, 33.1
-    p48 = np.zeros(810) + 48
-    # pot 7 contains rp=3.5-4.0, p=18.2, 33.1
-    p49 = np.zeros(320) + 49
-    # pot 1 contains rp=0.5-1.0, p=33.1, 60.3
-    p50 = np.zeros(6400) + 50
-    # pot 2 contains rp=1.0-1.5, p=33.1, 60.3
-    p51 = np.zeros(6400) + 51
-    # pot 3 contains rp=1.5-2.0, p=33.1, 60.3
-    p52 = np.zeros(12000) + 52
-    # pot 4 contains rp=2.0-2.5, p=33.1, 60.3
-    p53 = np.zeros(12000) + 53
-    # pot 5 contains rp=2.5-3.0, p=33.1, 60.3
-    p54 = np.zeros(5800) + 54
-    # pot 6 contains rp=3.0-3.5, p=33.1, 60.3
-    p55 = np.zeros(1600) + 55
-    # pot 7 contains rp=3.5-4.0, p=33.1, 60.3
-    p56 = np.zeros(210) + 56
-    # pot 1 contains rp=0.5-1.0, p=60.3, 110.
-    p57 = np.zeros(10000) + 57
-    # pot 2 contains rp=1.0-1.5, p=60.3, 110.
-    p58 = np.zeros(10000) + 58
-    # pot 3 contains rp=1.5-2.0, p=60.3, 110.
-    p59 = np.zeros(8300) + 59
-    # pot 4 contains rp=2.0-2.5, p=60.3, 110.
-    p60 = np.zeros(9600) + 60
-    # pot 5 contains rp=2.5-3.0, p=60.3, 110.
-    p61 = np.zeros(4200) + 61
-    # pot 6 contains rp=3.0-3.5, p=60.3, 110.
-    p62 = np.zeros(1700) + 62
-    # pot 7 contains rp=3.5-4.0, p=60.3, 110.
-    p63 = np.zeros(420) + 63
-    # pot 1 contains rp=0.5-1.0, p=110., 200.
-    p64 = np.zeros(19000) + 64
-    # pot 2 contains rp=1.0-1.5, p=110., 200.
-    p65 = np.zeros(19000) + 65
-    # pot 3 contains rp=1.5-2.0, p=110., 200.
-    p66 = np.zeros(10000) + 66
-    # pot 4 contains rp=2.0-2.5, p=110., 200.
-    p67 = np.zeros(4500) + 67
-    # pot 5 contains rp=2.5-3.0, p=110., 200.
-    p68 = np.zeros(1100) + 68
-    # pot 6 contains rp=3.0-3.5, p=110., 200.
-    p69 = np.zeros(160) + 69
-    # pot 7 contains rp=3.5-4.0, p=110., 200.
-    p70 = np.zeros(80) + 70
-    # pot 1 contains rp=0.5-1.0, p=110., 200.
-    p71 = np.zeros(19000) + 71
-    # pot 2 contains rp=1.0-1.5, p=110., 200.
-    p72 = np.zeros(19000) + 72
-    # pot 3 contains rp=1.5-2.0, p=110., 200.
-    p73 = np.zeros(10000) + 73
-    # pot 4 contains rp=2.0-2.5, p=110., 200.
-    p74 = np.zeros(4500) + 74
-    # pot 5 contains rp=2.5-3.0, p=110., 200.
-    p75 = np.zeros(1100) + 75
-    # pot 6 contains rp=3.0-3.5, p=110., 200.
-    p76 = np.zeros(160) + 76
-    # pot 7 contains rp=3.5-4.0, p=110., 200.
-    p77 = np.zeros(80) + 77
-
-    balls = np.r_[
-        balls,
-        p1,
-        p2,
-        p3,
-        p4,
-        p5,
-        p6,
-        p7,
-        p8,
-        p9,
-        p10,
-        p11,
-        p12,
-        p13,
-        p14,
-        p15,
-        p16,
-        p17,
-        p18,
-        p19,
-        p20,
-        p21,
-        p22,
-        p23,
-        p24,
-        p25,
-        p26,
-        p27,
-        p28,
-        p29,
-        p30,
-        p31,
-        p32,
-        p33,
-        p34,
-        p35,
-        p36,
-        p37,
-        p38,
-        p39,
-        p40,
-        p41,
-        p42,
-        p43,
-        p44,
-        p45,
-        p46,
-        p47,
-        p48,
-        p49,
-        p50,
-        p51,
-        p52,
-        p53,
-        p54,
-        p55,
-        p56,
-        p57,
-        p58,
-        p59,
-        p60,
-        p61,
-        p62,
-        p63,
-        p64,
-        p65,
-        p66,
-        p67,
-        p68,
-        p69,
-        p70,
-        p71,
-        p72,
-        p73,
-        p74,
-        p75,
-        p76,
-        p77,
-    ]
-
-    # lookup for what the balls mean
-    # outputs radlow, radhigh, Plow, Phigh
-    # 0.5, 0.91, 1.66, 3.02, 5.49, 10.0, 18.2, 33.1, 60.3, 110., 200.
-    ball_lookup = {
-        1: [0.5, 1.0, 0.5, 0.91],
-        2: [1.0, 1.5, 0.5, 0.91],
-        3: [1.5, 2.0, 0.5, 0.91],
-        4: [2.0, 2.5, 0.5, 0.91],
-        5: [2.5, 3.0, 0.5, 0.91],
-        6: [3.0, 3.5, 0.5, 0.91],
-        7: [3.5, 4.0, 0.5, 0.91],
-        8: [0.5, 1.0, 0.91, 1.66],
-        9: [1.0, 1.5, 0.91, 1.66],
-        10: [1.5, 2.0, 0.91, 1.66],
-        11: [2.0, 2.5, 0.91, 1.66],
-        12: [2.5, 3.0, 0.91, 1.66],
-        13: [3.0, 3.5, 0.91, 1.66],
-        14: [3.5, 4.0, 0.91, 1.66],
-        15: [0.5, 1.0, 1.66, 3.02],
-        16: [1.0, 1.5, 1.66, 3.02],
-        17: [1.5, 2.0, 1.66, 3.02],
-        18: [2.0, 2.5, 1.66, 3.02],
-        19: [2.5, 3.0, 1.66, 3.02],
-        20: [3.0, 3.5, 1.66, 3.02],
-        21: [3.5, 4.0, 1.66, 3.02],
-        22: [0.5, 1.0, 3.02, 5.49],
-        23: [1.0, 1.5, 3.02, 5.49],
-        24: [1.5, 2.0, 3.02, 5.49],
-        25: [2.0, 2.5, 3.02, 5.49],
-        26: [2.5, 3.0, 3.02, 5.49],
-        27: [3.0, 3.5, 3.02, 5.49],
-        28: [3.5, 4.0, 3.02, 5.49],
-        29: [0.5, 1.0, 5.49, 10.0],
-        30: [1.0, 1.5, 5.49, 10.0],
-        31: [1.5, 2.0, 5.49, 10.0],
-        32: [2.0, 2.5, 5.49, 10.0],
-        33: [2.5, 3.0, 5.49, 10.0],
-        34: [3.0, 3.5, 5.49, 10.0],
-        35: [3.5, 4.0, 5.49, 10.0],
-        36: [0.5, 1.0, 10.0, 18.2],
-        37: [1.0, 1.5, 10.0, 18.2],
-        38: [1.5, 2.0, 10.0, 18.2],
-        39: [2.0, 2.5, 10.0, 18.2],
-        40: [2.5, 3.0, 10.0, 18.2],
-        41: [3.0, 3.5, 10.0, 18.2],
-        42: [3.5, 4.0, 10.0, 18.2],
-        43: [0.5, 1.0, 18.2, 33.1],
-        44: [1.0, 1.5, 18.2, 33.1],
-        45: [1.5, 2.0, 18.2, 33.1],
-        46: [2.0, 2.5, 18.2, 33.1],
-        47: [2.5, 3.0, 18.2, 33.1],
-        48: [3.0, 3.5, 18.2, 33.1],
-        49: [3.5, 4.0, 18.2, 33.1],
-        50: [0.5, 1.0, 33.1, 60.3],
-        51: [1.0, 1.5, 33.1, 60.3],
-        52: [1.5, 2.0, 33.1, 60.3],
-        53: [2.0, 2.5, 33.1, 60.3],
-        54: [2.5, 3.0, 33.1, 60.3],
-        55: [3.0, 3.5, 33.1, 60.3],
-        56: [3.5, 4.0, 33.1, 60.3],
-        57: [0.5, 1.0, 60.3, 110.0],
-        58: [1.0, 1.5, 60.3, 110.0],
-        59: [1.5, 2.0, 60.3, 110.0],
-        60: [2.0, 2.5, 60.3, 110.0],
-        61: [2.5, 3.0, 60.3, 110.0],
-        62: [3.0, 3.5, 60.3, 110.0],
-        63: [3.5, 4.0, 60.3, 110.0],
-        64: [0.5, 1.0, 110.0, 200.0],
-        65: [1.0, 1.5, 110.0, 200.0],
-        66: [1.5, 2.0, 110.0, 200.0],
-        67: [2.0, 2.5, 110.0, 200.0],
-        68: [2.5, 3.0, 110.0, 200.0],
-        69: [3.0, 3.5, 110.0, 200.0],
-        70: [3.5, 4.0, 110.0, 200.0],
-        71: [0.5, 1.0, 200.0, 365.0],
-        72: [1.0, 1.5, 200.0, 365.0],
-        73: [1.5, 2.0, 200.0, 365.0],
-        74: [2.0, 2.5, 200.0, 365.0],
-        75: [2.5, 3.0, 200.0, 365.0],
-        76: [3.0, 3.5, 200.0, 365.0],
-        77: [3.5, 4.0, 200.0, 365.0],
-    }
-
-    rsamps = random.choice(balls, size=nselect)
-    radius = np.zeros(nselect)
-    period = np.zeros(nselect)
-    for i, samp in enumerate(rsamps):
-        rl, rh, pl, ph = ball_lookup[samp]
-        radius[i] = random.uniform(low=rl, high=rh)
-        period[i] = random.uniform(low=pl, high=ph)
+    OCCURRENCE_MODELS[name] = (sampler_class, list(files))
+    _SAMPLERS.pop(name, None)
 
-    return radius, period
 
+def get_sampler(name):
+    """
+    returns the sampler for a named occurrence model, building it on
+    first use and caching it for the rest of the process
+    """
+    if name not in _SAMPLERS:
+        if name not in OCCURRENCE_MODELS:
+            raise ValueError("unknown occurrence model {}".format(name))
+        sampler_class, files = OCCURRENCE_MODELS[name]
+        _SAMPLERS[name] = sampler_class.from_files(*files)
+    return _SAMPLERS[name]
 
-def Petigura18_select(nselect=1):
-    # create a pot for pedigura numbers (balls)
-    balls = np.array([])
-
-    p1 = np.zeros(2) + 1
-    p2 = np.zeros(8) + 2
-    p3 = np.zeros(21) + 3
-    p4 = np.zeros(8) + 4
-    p5 = np.zeros(24) + 5
-    p6 = np.zeros(52) + 6
-    p7 = np.zeros(77) + 7
-    p8 = np.zeros(5) + 8
-    p9 = np.zeros(26) + 9
-    p10 = np.zeros(24) + 10
-    p11 = np.zeros(145) + 11
-    p12 = np.zeros(259) + 12
-    p13 = np.zeros(5) + 13
-    p14 = np.zeros(12) + 14
-    p15 = np.zeros(18) + 15
-    p16 = np.zeros(17) + 16
-    p17 = np.zeros(38) + 17
-    p18 = np.zeros(168) + 18
-    p19 = np.zeros(12) + 19
-    p20 = np.zeros(8) + 20
-    p21 = np.zeros(25) + 21
-    p22 = np.zeros(56) + 22
-    p23 = np.zeros(53) + 23
-    p24 = np.zeros(78) + 24
-    p25 = np.zeros(84) + 25
-    p26 = np.zeros(78) + 26
-    p27 = np.zeros(6) + 27
-    p28 = np.zeros(8) + 28
-    p29 = np.zeros(94) + 29
-    p30 = np.zeros(180) + 30
-    p31 = np.zeros(185) + 31
-    p32 = np.zeros(258) + 32
-    p33 = np.zeros(275) + 33
-    p34 = np.zeros(312) + 34
-    p35 = np.zeros(225) + 35
-    p36 = np.zeros(8) + 36
-    p37 = np.zeros(77) + 37
-    p38 = np.zeros(138) + 38
-    p39 = np.zeros(423) + 39
-    p40 = np.zeros(497) + 40
-    p41 = np.zeros(667) + 41
-    p42 = np.zeros(475) + 42
-    p43 = np.zeros(270) + 43
-    p44 = np.zeros(147) + 44
-    p45 = np.zeros(8) + 45
-    p46 = np.zeros(34) + 46
-    p47 = np.zeros(125) + 47
-    p48 = np.zeros(202) + 48
-    p49 = np.zeros(279) + 49
-    p50 = np.zeros(261) + 50
-    p51 = np.zeros(251) + 51
-    p52 = np.zeros(186) + 52
-    p53 = np.zeros(360) + 53
-    p54 = np.zeros(393) + 54
-    p55 = np.zeros(12) + 55
-    p56 = np.zeros(36) + 56
-    p57 = np.zeros(141) + 57
-    p58 = np.zeros(263) + 58
-    p59 = np.zeros(450) + 59
-    p60 = np.zeros(350) + 60
-    p61 = np.zeros(287) + 61
-    p62 = np.zeros(249) + 62
-    p63 = np.zeros(12) + 63
-    p64 = np.zeros(52) + 64
-    p65 = np.zeros(128) + 65
-    p66 = np.zeros(315) + 66
-    p67 = np.zeros(205) + 67
-    p68 = np.zeros(447) + 68
-    p69 = np.zeros(8) + 69
-    p70 = np.zeros(50) + 70
-
-    balls = np.r_[
-        balls,
-        p1,
-        p2,
-        p3,
-        p4,
-        p5,
-        p6,
-        p7,
-        p8,
-        p9,
-        p10,
-        p11,
-        p12,
-        p13,
-        p14,
-        p15,
-        p16,
-        p17,
-        p18,
-        p19,
-        p20,
-        p21,
-        p22,
-        p23,
-        p24,
-        p25,
-        p26,
-        p27,
-        p28,
-        p29,
-        p30,
-        p31,
-        p32,
-        p33,
-        p34,
-        p35,
-        p36,
-        p37,
-        p38,
-        p39,
-        p40,
-        p41,
-        p42,
-        p43,
-        p44,
-        p45,
-        p46,
-        p47,
-        p48,
-        p49,
-        p50,
-        p51,
-        p52,
-        p53,
-        p54,
-        p55,
-        p56,
-        p57,
-        p58,
-        p59,
-        p60,
-        p61,
-        p62,
-        p63,
-        p64,
-        p65,
-        p66,
-        p67,
-        p68,
-        p69,
-        p70,
-    ]
-
-    ball_lookup = {
-        0: [0.0, 0.0, 0.0, 0.0],
-        1: [11.31, 16.00, 1.00, 1.78],
-        2: [11.31, 16.00, 1.78, 3.16],
-        3: [11.31, 16.00, 3.16, 5.62],
-        4: [11.31, 16.00, 5.62, 10.00],
-        5: [11.31, 16.00, 31.62, 56.23],
-        6: [11.31, 16.00, 100.00, 177.83],
-        7: [11.31, 16.00, 177.83, 316.23],
-        8: [8.00, 11.31, 3.16, 5.62],
-        9: [8.00, 11.31, 17.78, 31.62],
-        10: [8.00, 11.31, 31.62, 56.23],
-        11: [8.00, 11.31, 100.00, 177.83],
-        12: [8.00, 11.31, 177.83, 316.23],
-        13: [5.66, 8.00, 3.16, 5.62],
-        14: [5.66, 8.00, 5.62, 10.00],
-        15: [5.66, 8.00, 10.00, 17.78],
-        16: [5.66, 8.00, 17.78, 31.62],
-        17: [5.66, 8.00, 31.62, 56.23],
-        18: [5.66, 8.00, 177.83, 316.23],
-        19: [4.00, 5.66, 3.16, 5.62],
-        20: [4.00, 5.66, 5.62, 10.00],
-        21: [4.00, 5.66, 10.00, 17.78],
-        22: [4.00, 5.66, 17.78, 31.62],
-        23: [4.00, 5.66, 31.62, 56.23],
-        24: [4.00, 5.66, 56.23, 100.00],
-        25: [4.00, 5.66, 100.00, 177.83],
-        26: [4.00, 5.66, 177.83, 316.23],
-        27: [2.83, 4.00, 1.78, 3.16],
-        28: [2.83, 4.00, 3.16, 5.62],
-        29: [2.83, 4.00, 5.62, 10.00],
-        30: [2.83, 4.00, 10.00, 17.78],
-        31: [2.83, 4.00, 17.78, 31.62],
-        32: [2.83, 4.00, 31.62, 56.23],
-        33: [2.83, 4.00, 56.23, 100.00],
-        34: [2.83, 4.00, 100.00, 177.83],
-        35: [2.83, 4.00, 177.83, 316.23],
-        36: [2.00, 2.83, 1.78, 3.16],
-        37: [2.00, 2.83, 3.16, 5.62],
-        38: [2.00, 2.83, 5.62, 10.00],
-        39: [2.00, 2.83, 10.00, 17.78],
-        40: [2.00, 2.83, 17.78, 31.62],
-        41: [2.00, 2.83, 31.62, 56.23],
-        42: [2.00, 2.83, 56.23, 100.00],
-        43: [2.00, 2.83, 100.00, 177.83],
-        44: [2.00, 2.83, 177.83, 316.23],
-        45: [1.41, 2.00, 1.00, 1.78],
-        46: [1.41, 2.00, 1.78, 3.16],
-        47: [1.41, 2.00, 3.16, 5.62],
-        48: [1.41, 2.00, 5.62, 10.00],
-        49: [1.41, 2.00, 10.00, 17.78],
-        50: [1.41, 2.00, 17.78, 31.62],
-        51: [1.41, 2.00, 31.62, 56.23],
-        52: [1.41, 2.00, 56.23, 100.00],
-        53: [1.41, 2.00, 100.00, 177.83],
-        54: [1.41, 2.00, 177.83, 316.23],
-        55: [1.00, 1.41, 1.00, 1.78],
-        56: [1.00, 1.41, 1.78, 3.16],
-        57: [1.00, 1.41, 3.16, 5.62],
-        58: [1.00, 1.41, 5.62, 10.00],
-        59: [1.00, 1.41, 10.00, 17.78],
-        60: [1.00, 1.41, 17.78, 31.62],
-        61: [1.00, 1.41, 31.62, 56.23],
-        62: [1.00, 1.41, 56.23, 100.00],
-        63: [0.71, 1.00, 1.00, 1.78],
-        64: [0.71, 1.00, 1.78, 3.16],
-        65: [0.71, 1.00, 3.16, 5.62],
-        66: [0.71, 1.00, 5.62, 10.00],
-        67: [0.71, 1.00, 10.00, 17.78],
-        68: [0.71, 1.00, 17.78, 31.62],
-        69: [0.50, 0.71, 1.00, 1.78],
-        70: [0.50, 0.71, 1.78, 3.16],
-    }
-
-    rsamps = random.choice(balls, size=nselect)
-    radius = np.zeros(nselect)
-    period = np.zeros(nselect)
-    for i, samp in enumerate(rsamps):
-        rl, rh, pl, ph = ball_lookup[samp]
-
-        if samp in [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12]:
-            # check for giant planets
-            # if a giant planet than draw power law
-            radius[i] = rndm(8, 16, -1.7)
-        else:
-            radius[i] = random.uniform(low=rl, high=rh)
 
-        period[i] = random.uniform(low=pl, high=ph)
+def Fressin13_select_extrap(nselect=1):
+    return get_sampler("Fressin13").draw(nselect)
 
-    return radius, period
+
+def Dressing15_select_extrap(nselect=1):
+    """
+    period bins = 0.5, 0.91, 1.66, 3.02, 5.49, 10.0, 18.2, 33.1, 60.3, 110., 200.
+    """
+    return get_sampler("Dressing15").draw(nselect)
+
+
+def Petigura18_select(nselect=1):
+    return get_sampler("Petigura18").draw(nselect)
 
 
 def per2ars(per, mstar, rstar):
@@ -926,262 +387,386 @@ def get_rprs(Prad, rstar_solar):
     return (Prad * 0.009155) / rstar_solar
 
 
-def make_allplanets_df_vec_extrap(df, starid_zp):
-    # lets refector the above code to make it array operations
-    totalRows = df.loc[:, "Nplanets"].sum()
+def _windows(timeline, nsectors, sectorlength, first_sector):
+    """
+    the first nsectors windows of timeline, or if there is none nsectors
+    back to back windows of sectorlength days from first_sector on
+    """
+    if timeline is None:
+        return MissionTimeline.regular(nsectors, sectorlength, first_sector)
+    return timeline.head(nsectors)
 
-    df.loc[:, "planetRadius"] = pd.Series()
-    df.loc[:, "planetPeriod"] = pd.Series()
-    df.loc[:, "starID"] = pd.Series()
 
-    radper_m = Dressing15_select_extrap(totalRows)
-    radper_fgk = Petigura18_select(totalRows)
+def count_transits(T0, period, coverage, sectorlength=13.7, first_sector=0,
+                   nsectors=None, chunksize=20000, timeline=None):
+    """
+    returns the number of transits of each planet that land in an observed
+    sector.
+
+    coverage is a SectorCoverage (or a (planet x sector) array, nonzero
+    where the planet's star is on silicon); only its first nsectors sectors
+    are used, and sectors beyond it are unobserved. Sector k is window k
+    of timeline, a MissionTimeline, or without one the window
+    (sectorlength * (k + first_sector), sectorlength * (k + 1 + first_sector)],
+    so a transit exactly on an edge belongs to the earlier sector (see
+    MissionTimeline.transits). With numba installed the compiled kernel
+    does this (see kernels.count_transits); otherwise planets are done
+    chunksize at a time to bound memory.
+    """
+    if not isinstance(coverage, SectorCoverage):
+        coverage = SectorCoverage.from_dense(coverage)
+    if nsectors is None:
+        nsectors = coverage.nsectors
+    # sectors past the coverage are unobserved, so hold no transits
+    nsectors = min(nsectors, coverage.nsectors)
+    windows = _windows(timeline, nsectors, sectorlength, first_sector)
+    nsectors = len(windows)
+    T0 = np.asarray(T0, dtype=float)
+    period = np.asarray(period, dtype=float)
+    if kernels.use_jit:
+        return kernels.count_transits(T0, period, windows.edges,
+                                      windows.istart, windows.iend,
+                                      coverage.words)
+    ntransits = np.zeros(T0.shape[0], dtype=np.int64)
+    for start in range(0, T0.shape[0], chunksize):
+        sl = slice(start, start + chunksize)
+        per_sector = windows.transits(T0[sl], period[sl])
+        per_sector *= coverage.to_dense(sl, slice(0, nsectors))
+        ntransits[sl] = per_sector.sum(axis=1)
+    return ntransits
+
+
+def transit_matrix(T0, period, nsectors, sectorlength=13.7, first_sector=0,
+                   chunksize=20000, timeline=None):
+    """
+    returns the number of transits of each planet in each of nsectors
+    sectors, binned as in count_transits, as a (planet x sector) array of
+    the smallest unsigned type that holds them. It doesn't depend on which
+    sectors are observed, so it can be worked out once and then reduced
+    against the coverage of any number of pointing strategies (with the
+    same timeline) with count_transits_matrix.
+    """
+    windows = _windows(timeline, nsectors, sectorlength, first_sector)
+    T0 = np.asarray(T0, dtype=float)
+    period = np.asarray(period, dtype=float)
+    # a window holds at most ceil(its length / period) + 1 transits
+    most = 1
+    if T0.shape[0] and len(windows):
+        longest = (windows.end - windows.start).max()
+        most += int(np.ceil(np.nanmax(longest / period)))
+    dtype = np.min_scalar_type(most)
+    transits = np.zeros((T0.shape[0], len(windows)), dtype=dtype)
+    for start in range(0, T0.shape[0], chunksize):
+        sl = slice(start, start + chunksize)
+        transits[sl] = windows.transits(T0[sl], period[sl])
+    return transits
+
+
+def count_transits_matrix(transits, coverage, nsectors=None, chunksize=20000):
+    """
+    count_transits from a transit_matrix: the number of transits of each
+    planet in the sectors, of the first nsectors, in which coverage (a
+    SectorCoverage of the same planets) has it observed. With numba
+    installed the compiled kernel does this (see
+    kernels.count_transits_matrix); otherwise planets are done chunksize at
+    a time to bound memory.
+    """
+    if nsectors is None:
+        nsectors = coverage.nsectors
+    nsectors = min(nsectors, coverage.nsectors, transits.shape[1])
+    if kernels.use_jit:
+        return kernels.count_transits_matrix(transits, coverage.words,
+                                             nsectors)
+    ntransits = np.zeros(transits.shape[0], dtype=np.int64)
+    for start in range(0, transits.shape[0], chunksize):
+        sl = slice(start, start + chunksize)
+        observed = coverage.to_dense(sl, slice(0, nsectors))
+        ntransits[sl] = (transits[sl, :nsectors] * observed).sum(
+            axis=1, dtype=np.int64)
+    return ntransits
+
+
+def max_transits(T0, period, sectorlength=13.7, first_sector=0, nsectors=1,
+                 timeline=None):
+    """
+    returns the number of transits of each planet from the start of the
+    first of nsectors sectors to the end of the last, binned as in
+    count_transits: an upper bound on count_transits for any coverage of
+    those sectors, and exactly count_transits with all of them observed if
+    there are no gaps between them. Only the two ends are needed.
+    """
+    windows = _windows(timeline, nsectors, sectorlength, first_sector)
+    T0 = np.asarray(T0, dtype=float)
+    period = np.asarray(period, dtype=float)
+    if not len(windows):
+        return np.zeros(T0.shape[0], dtype=np.int64)
+    start = windows.start[0]
+    end = windows.end[-1]
+    nstart = np.maximum(np.floor((start - T0) / period) + 1, 0)
+    nend = np.maximum(np.floor((end - T0) / period) + 1, 0)
+    return (nend - nstart).astype(np.int64)
+
+
+def draw_planets(isMdwarf, mdwarf_model="Dressing15", fgk_model="Petigura18",
+                 rng=np.random):
+    """
+    returns radius, period for planets whose host is or is not an M dwarf.
+    Each occurrence model only draws as many planets as its stellar class
+    needs, written straight into the output arrays.
+    """
+    isMdwarf = np.asarray(isMdwarf, dtype=bool)
+    radius = np.empty(isMdwarf.shape[0])
+    period = np.empty(isMdwarf.shape[0])
+    for mask, model in [(isMdwarf, mdwarf_model), (~isMdwarf, fgk_model)]:
+        nselect = np.count_nonzero(mask)
+        if nselect > 0:
+            radius[mask], period[mask] = get_sampler(model).draw(
+                nselect, rng=rng)
+    return radius, period
+
 
+def make_allplanets_df_vec_extrap(df, starid_zp, mdwarf_model="Dressing15",
+                                  fgk_model="Petigura18", rng=np.random):
+    # lets refector the above code to make it array operations
     # we need an array of indices
     rowIdx = np.repeat(np.arange(df.shape[0]), np.array(df.Nplanets.values))
 
-    newdf = df.iloc[rowIdx]
-    newdf.loc[:, "starID"] = rowIdx + starid_zp
+    newdf = df.iloc[rowIdx].copy()
+    newdf["starID"] = rowIdx + starid_zp
 
-    newdf.loc[:, "planetRadius"] = np.where(
-        newdf.isMdwarf, radper_m[0], radper_fgk[0]
-    )
-    newdf.loc[:, "planetPeriod"] = np.where(
-        newdf.isMdwarf, radper_m[1], radper_fgk[1]
+    radius, period = draw_planets(
+        newdf.isMdwarf.values, mdwarf_model=mdwarf_model, fgk_model=fgk_model,
+        rng=rng
     )
+    newdf["planetRadius"] = radius
+    newdf["planetPeriod"] = period
     newdf.set_index(np.arange(newdf.shape[0]), inplace=True)
 
     return newdf, newdf.starID.iloc[-1]
 
 
-def kepler_noise_1h(kepmag):
-    # 1 hour CDPP
-    # these numbers are from the Q14 measured rmscdpp
-    mag_level, noise_level = np.array(
-        [
-            [0.0, 20.0],
-            [3.0, 20.0],
-            [6.0, 20.0],
-            [8.0, 20.0],
-            [9.00995575221239, 20.000000000000057],
-            [9.120575221238939, 22.523364485981347],
-            [9.253318584070797, 23.925233644859844],
-            [9.380530973451327, 25.607476635514047],
-            [9.59070796460177, 27.570093457943983],
-            [9.773230088495575, 28.41121495327107],
-            [9.972345132743364, 28.691588785046775],
-            [10.143805309734514, 29.252336448598186],
-            [10.326327433628318, 28.97196261682248],
-            [10.525442477876107, 28.97196261682248],
-            [10.719026548672566, 28.691588785046775],
-            [10.857300884955752, 28.97196261682248],
-            [11.045353982300885, 28.97196261682248],
-            [11.27212389380531, 29.813084112149596],
-            [11.48783185840708, 31.214953271028065],
-            [11.692477876106196, 32.05607476635518],
-            [11.819690265486726, 32.89719626168227],
-            [11.996681415929203, 34.57943925233647],
-            [12.13495575221239, 35.420560747663586],
-            [12.267699115044248, 36.822429906542084],
-            [12.411504424778762, 37.943925233644904],
-            [12.56637168141593, 39.62616822429911],
-            [12.71570796460177, 41.028037383177605],
-            [12.876106194690266, 43.27102803738322],
-            [13.069690265486727, 45.794392523364536],
-            [13.252212389380531, 48.03738317757015],
-            [13.4070796460177, 51.12149532710285],
-            [13.561946902654867, 54.20560747663555],
-            [13.733407079646017, 58.130841121495365],
-            [13.83849557522124, 60.37383177570098],
-            [13.971238938053098, 64.2990654205608],
-            [14.065265486725664, 67.6635514018692],
-            [14.153761061946902, 70.74766355140193],
-            [14.231194690265488, 73.55140186915892],
-            [14.308628318584072, 76.35514018691595],
-            [14.386061946902656, 79.71962616822435],
-            [14.446902654867257, 82.24299065420567],
-            [14.513274336283185, 85.32710280373837],
-            [14.596238938053098, 89.53271028037389],
-            [14.690265486725664, 94.01869158878509],
-            [14.767699115044248, 97.66355140186923],
-            [14.823008849557523, 101.02803738317763],
-            [14.883849557522126, 104.95327102803745],
-            [14.96128318584071, 109.43925233644865],
-            [15.011061946902656, 112.52336448598138],
-        ]
-    ).T
-    mag_interp = interp1d(
-        mag_level, noise_level, kind="linear", fill_value="extrapolate"
+def make_allplanets_df_batch(df, nplanets, overlays=None, starid_zp=0,
+                             mdwarf_model="Dressing15",
+                             fgk_model="Petigura18", rng=np.random):
+    """
+    planets for several realizations of the same stars at once.
+
+    nplanets is (nrealizations, nstars), the number of planets each star of
+    df has in each realization. overlays maps column names to values that
+    vary by realization, also (nrealizations, nstars), e.g. cosi; they are
+    copied onto each star's planets in place of df's column. Returns one
+    DataFrame of the planets of every realization with a "realization"
+    column. starID is the star's row in df plus starid_zp, the same in
+    every realization.
+    """
+    nplanets = np.asarray(nplanets)
+    nrealizations, nstars = nplanets.shape
+    rowIdx = np.repeat(np.arange(nrealizations * nstars), nplanets.ravel())
+    star = rowIdx % nstars
+
+    newdf = df.iloc[star].copy()
+    newdf["Nplanets"] = nplanets.ravel()[rowIdx]
+    for name, values in (overlays or {}).items():
+        newdf[name] = np.asarray(values).ravel()[rowIdx]
+    newdf["realization"] = rowIdx // nstars
+    newdf["starID"] = star + starid_zp
+
+    radius, period = draw_planets(
+        newdf.isMdwarf.values, mdwarf_model=mdwarf_model, fgk_model=fgk_model,
+        rng=rng
     )
-    return mag_interp(kepmag) * np.sqrt(6.5)
+    newdf["planetRadius"] = radius
+    newdf["planetPeriod"] = period
+    newdf.set_index(np.arange(newdf.shape[0]), inplace=True)
 
-def kepler_noise_1h_quiet(kepmag):
-    # 1 hour CDPP
-    # this is calculated from the rrmscdpp06p0
-    mag_level, noise_level = np.array(
-        [
-            [0.0, 20.0],
-            [3.0, 20.0],
-            [6.0, 20.0],
-            [8.0, 20.0],
-            [9.00995575221239, 20.000000000000057],
-            [9.2, 21.2625],
-            [9.299999999999999, 20],
-            [9.399999999999999, 14.389000000000001],
-            [9.499999999999998, 24.667499999999997],
-            [9.599999999999998, 24.392500000000005],
-            [9.699999999999998, 26.223],
-            [9.799999999999997, 19.779],
-            [9.899999999999997, 14.007],
-            [9.999999999999996, 17.862000000000005],
-            [10.099999999999996, 20.965],
-            [10.299999999999995, 20.464],
-            [10.399999999999995, 19.271],
-            [10.499999999999995, 16.5505],
-            [10.599999999999994, 21.195999999999998],
-            [10.699999999999994, 26.0565],
-            [10.799999999999994, 27.654],
-            [10.899999999999993, 25.377],
-            [10.999999999999993, 22.171],
-            [11.099999999999993, 24.851],
-            [11.199999999999992, 24.87],
-            [11.299999999999992, 27.1965],
-            [11.399999999999991, 25.774],
-            [11.499999999999991, 27.665],
-            [11.59999999999999, 30.0305],
-            [11.69999999999999, 31.01],
-            [11.79999999999999, 32.178],
-            [11.89999999999999, 31.628],
-            [11.99999999999999, 32.558],
-            [12.099999999999989, 35.0385],
-            [12.199999999999989, 35.259],
-            [12.299999999999988, 36.119],
-            [12.399999999999988, 37.184],
-            [12.499999999999988, 39.861999999999995],
-            [12.599999999999987, 41.931000000000004],
-            [12.699999999999987, 42.528],
-            [12.799999999999986, 43.259],
-            [12.899999999999986, 45.439],
-            [12.999999999999986, 49.3505],
-            [13.099999999999985, 50.164],
-            [13.199999999999985, 53.51300000000001],
-            [13.299999999999985, 55.575],
-            [13.399999999999984, 57.218999999999994],
-            [13.499999999999984, 60.161500000000004],
-            [13.599999999999984, 62.68],
-            [13.699999999999983, 65.464],
-            [13.799999999999983, 70.37],
-            [13.899999999999983, 73.724],
-            [13.999999999999982, 77.017],
-            [14.099999999999982, 81.047],
-            [14.199999999999982, 85.068],
-            [14.299999999999981, 89.715],
-            [14.39999999999998, 95.31],
-            [14.49999999999998, 101.193],
-            [14.59999999999998, 106.978],
-            [14.69999999999998, 112.5995],
-            [14.79999999999998, 118.04700000000001],
-            [14.899999999999979, 125.4615],
-            [14.999999999999979, 133.9125],
-            [15.099999999999978, 141.15500000000003],
-            [15.199999999999978, 149.125],
-            [15.299999999999978, 159.1295],
-            [15.399999999999977, 168.91],
-            [15.499999999999977, 179.018],
-            [15.599999999999977, 192.773],
-            [15.699999999999976, 202.986],
-            [15.799999999999976, 218.581],
-            [15.899999999999975, 234.59900000000002],
-            [15.999999999999975, 245.80700000000002],
-            [16.099999999999973, 287.57599999999996],
-            [16.199999999999974, 282.94399999999996],
-            [16.299999999999976, 270.305],
-            [16.399999999999974, 321.54200000000003],
-            [16.49999999999997, 359.365],
-            [16.599999999999973, 349.54400000000015],
-            [16.699999999999974, 417.082],
-            [16.799999999999972, 425.254],
-            [16.89999999999997, 419.8280000000001],
-            [17.099999999999973, 434.58],
-        ]
-    ).T
-    mag_interp = interp1d(
-        mag_level, noise_level, kind="linear", fill_value="extrapolate"
-    )
-    return mag_interp(kepmag) * np.sqrt(6.)
+    return newdf
 
 
-def make_allplanets_df_vec_extrap_kepler(df, starid_zp, ocrMeasurement):
-    totalRows = df.loc[:, "Nplanets"].sum()
+def count_by_realization(realization, mask, nrealizations):
+    """
+    number of rows with mask set in each realization, e.g. the detections
+    per realization of a make_allplanets_df_batch run
+    """
+    realization = np.asarray(realization)
+    return np.bincount(realization[np.asarray(mask, dtype=bool)],
+                       minlength=nrealizations)
+
+
+# 1 hour CDPP
+# these numbers are from the Q14 measured rmscdpp
+KEPLER_NOISE = InterpolatedNoise(
+    levels=[
+        [0.0, 20.0],
+        [3.0, 20.0],
+        [6.0, 20.0],
+        [8.0, 20.0],
+        [9.00995575221239, 20.000000000000057],
+        [9.120575221238939, 22.523364485981347],
+        [9.253318584070797, 23.925233644859844],
+        [9.380530973451327, 25.607476635514047],
+        [9.59070796460177, 27.570093457943983],
+        [9.773230088495575, 28.41121495327107],
+        [9.972345132743364, 28.691588785046775],
+        [10.143805309734514, 29.252336448598186],
+        [10.326327433628318, 28.97196261682248],
+        [10.525442477876107, 28.97196261682248],
+        [10.719026548672566, 28.691588785046775],
+        [10.857300884955752, 28.97196261682248],
+        [11.045353982300885, 28.97196261682248],
+        [11.27212389380531, 29.813084112149596],
+        [11.48783185840708, 31.214953271028065],
+        [11.692477876106196, 32.05607476635518],
+        [11.819690265486726, 32.89719626168227],
+        [11.996681415929203, 34.57943925233647],
+        [12.13495575221239, 35.420560747663586],
+        [12.267699115044248, 36.822429906542084],
+        [12.411504424778762, 37.943925233644904],
+        [12.56637168141593, 39.62616822429911],
+        [12.71570796460177, 41.028037383177605],
+        [12.876106194690266, 43.27102803738322],
+        [13.069690265486727, 45.794392523364536],
+        [13.252212389380531, 48.03738317757015],
+        [13.4070796460177, 51.12149532710285],
+        [13.561946902654867, 54.20560747663555],
+        [13.733407079646017, 58.130841121495365],
+        [13.83849557522124, 60.37383177570098],
+        [13.971238938053098, 64.2990654205608],
+        [14.065265486725664, 67.6635514018692],
+        [14.153761061946902, 70.74766355140193],
+        [14.231194690265488, 73.55140186915892],
+        [14.308628318584072, 76.35514018691595],
+        [14.386061946902656, 79.71962616822435],
+        [14.446902654867257, 82.24299065420567],
+        [14.513274336283185, 85.32710280373837],
+        [14.596238938053098, 89.53271028037389],
+        [14.690265486725664, 94.01869158878509],
+        [14.767699115044248, 97.66355140186923],
+        [14.823008849557523, 101.02803738317763],
+        [14.883849557522126, 104.95327102803745],
+        [14.96128318584071, 109.43925233644865],
+        [15.011061946902656, 112.52336448598138],
+    ],
+    scale=np.sqrt(6.5),
+)
+
+# 1 hour CDPP
+# this is calculated from the rrmscdpp06p0
+KEPLER_NOISE_QUIET = InterpolatedNoise(
+    levels=[
+        [0.0, 20.0],
+        [3.0, 20.0],
+        [6.0, 20.0],
+        [8.0, 20.0],
+        [9.00995575221239, 20.000000000000057],
+        [9.2, 21.2625],
+        [9.299999999999999, 20],
+        [9.399999999999999, 14.389000000000001],
+        [9.499999999999998, 24.667499999999997],
+        [9.599999999999998, 24.392500000000005],
+        [9.699999999999998, 26.223],
+        [9.799999999999997, 19.779],
+        [9.899999999999997, 14.007],
+        [9.999999999999996, 17.862000000000005],
+        [10.099999999999996, 20.965],
+        [10.299999999999995, 20.464],
+        [10.399999999999995, 19.271],
+        [10.499999999999995, 16.5505],
+        [10.599999999999994, 21.195999999999998],
+        [10.699999999999994, 26.0565],
+        [10.799999999999994, 27.654],
+        [10.899999999999993, 25.377],
+        [10.999999999999993, 22.171],
+        [11.099999999999993, 24.851],
+        [11.199999999999992, 24.87],
+        [11.299999999999992, 27.1965],
+        [11.399999999999991, 25.774],
+        [11.499999999999991, 27.665],
+        [11.59999999999999, 30.0305],
+        [11.69999999999999, 31.01],
+        [11.79999999999999, 32.178],
+        [11.89999999999999, 31.628],
+        [11.99999999999999, 32.558],
+        [12.099999999999989, 35.0385],
+        [12.199999999999989, 35.259],
+        [12.299999999999988, 36.119],
+        [12.399999999999988, 37.184],
+        [12.499999999999988, 39.861999999999995],
+        [12.599999999999987, 41.931000000000004],
+        [12.699999999999987, 42.528],
+        [12.799999999999986, 43.259],
+        [12.899999999999986, 45.439],
+        [12.999999999999986, 49.3505],
+        [13.099999999999985, 50.164],
+        [13.199999999999985, 53.51300000000001],
+        [13.299999999999985, 55.575],
+        [13.399999999999984, 57.218999999999994],
+        [13.499999999999984, 60.161500000000004],
+        [13.599999999999984, 62.68],
+        [13.699999999999983, 65.464],
+        [13.799999999999983, 70.37],
+        [13.899999999999983, 73.724],
+        [13.999999999999982, 77.017],
+        [14.099999999999982, 81.047],
+        [14.199999999999982, 85.068],
+        [14.299999999999981, 89.715],
+        [14.39999999999998, 95.31],
+        [14.49999999999998, 101.193],
+        [14.59999999999998, 106.978],
+        [14.69999999999998, 112.5995],
+        [14.79999999999998, 118.04700000000001],
+        [14.899999999999979, 125.4615],
+        [14.999999999999979, 133.9125],
+        [15.099999999999978, 141.15500000000003],
+        [15.199999999999978, 149.125],
+        [15.299999999999978, 159.1295],
+        [15.399999999999977, 168.91],
+        [15.499999999999977, 179.018],
+        [15.599999999999977, 192.773],
+        [15.699999999999976, 202.986],
+        [15.799999999999976, 218.581],
+        [15.899999999999975, 234.59900000000002],
+        [15.999999999999975, 245.80700000000002],
+        [16.099999999999973, 287.57599999999996],
+        [16.199999999999974, 282.94399999999996],
+        [16.299999999999976, 270.305],
+        [16.399999999999974, 321.54200000000003],
+        [16.49999999999997, 359.365],
+        [16.599999999999973, 349.54400000000015],
+        [16.699999999999974, 417.082],
+        [16.799999999999972, 425.254],
+        [16.89999999999997, 419.8280000000001],
+        [17.099999999999973, 434.58],
+    ],
+    scale=np.sqrt(6.),
+)
 
-    df.loc[:, "planetRadius"] = pd.Series()
-    df.loc[:, "planetPeriod"] = pd.Series()
-    df.loc[:, "starID"] = pd.Series()
 
-    radper_m = Dressing15_select_extrap(totalRows)
-    radper_fgk = Bryson_select(totalRows, ocrMeasurement=ocrMeasurement)
+def kepler_noise_1h(kepmag):
+    return KEPLER_NOISE(kepmag)
 
-    # we need an array of indices
-    rowIdx = np.repeat(np.arange(df.shape[0]), np.array(df.Nplanets.values))
 
-    newdf = df.iloc[rowIdx]
-    newdf.loc[:, "starID"] = rowIdx + starid_zp
+def kepler_noise_1h_quiet(kepmag):
+    return KEPLER_NOISE_QUIET(kepmag)
 
-    newdf.loc[:, "planetRadius"] = np.where(
-        newdf.isMdwarf, radper_m[0], radper_fgk[0]
-    )
-    newdf.loc[:, "planetPeriod"] = np.where(
-        newdf.isMdwarf, radper_m[1], radper_fgk[1]
+
+def make_allplanets_df_vec_extrap_kepler(df, starid_zp, ocrMeasurement,
+                                         mdwarf_model="Dressing15",
+                                         fgk_model=None, rng=np.random):
+    if fgk_model is None:
+        fgk_model = occurrence_model_name(ocrMeasurement)
+    return make_allplanets_df_vec_extrap(
+        df, starid_zp, mdwarf_model=mdwarf_model, fgk_model=fgk_model, rng=rng
     )
-    newdf.set_index(np.arange(newdf.shape[0]), inplace=True)
 
-    return newdf, newdf.starID.iloc[-1]
 
+def occurrence_model_name(ocrMeasurement):
+    """
+    name of the FGK occurrence model used for a Kepler ocrMeasurement
+    """
+    if ocrMeasurement == 'LUVOIR':
+        return "LUVOIR"
+    return "Bryson-" + ocrMeasurement
 
-def Bryson_select(nselect=1, ocrMeasurement='bryson'):
-    balls = np.array([])
-
-    if ocrMeasurement == 'bryson':
-        fn_occ = "../data/bryson/occurrenceGrid_1100_bryson.npy"
-    elif ocrMeasurement == 'burke':
-        fn_occ = "../data/bryson/occurrenceGrid_1100_burke.npy"
-    elif ocrMeasurement == 'LUVOIR':
-        # simulate the LUVOIR eta-earth planets
-        radius = np.zeros(nselect)
-        period = np.zeros(nselect)
-        radius = random.uniform(low=0.8, high=1.4, size=nselect)
-        period = random.uniform(low=338, high=778, size=nselect)
-        return radius, period
-    fn_p = "../data/bryson/occurrencePeriod_1100.npy"
-    fn_r = "../data/bryson/occurrenceRadius_1100.npy"
-    ocrGrid = np.load(fn_occ)
-    rp1D = np.load(fn_r)
-    period1D = np.load(fn_p)
-
-    # use a 100 x 100 grid
-    occBalls = np.round(ocrGrid.flatten() * 1.0e7)
-    for i in range(occBalls.shape[0]):
-        balls = np.r_[balls, np.zeros(int(occBalls[i])) + i]
-
-    ball_lookup = {}
-    dPeriod = period1D[1] - period1D[0]
-    dRadius = rp1D[1] - rp1D[0]
-    for i in range(300):
-        for j in range(300):
-            ball_lookup[i * 300 + j] = [
-                rp1D[j] - dRadius / 2,
-                rp1D[j] + dRadius / 2,
-                period1D[i] - dPeriod / 2,
-                period1D[i] + dPeriod / 2,
-            ]
-
-    rsamps = random.choice(balls, size=nselect)
-    radius = np.zeros(nselect)
-    period = np.zeros(nselect)
-    for i, samp in enumerate(rsamps):
-        rl, rh, pl, ph = ball_lookup[samp]
-
-        radius[i] = random.uniform(low=rl, high=rh)
-        period[i] = random.uniform(low=pl, high=ph)
 
-    return radius, period
+def Bryson_select(nselect=1, ocrMeasurement='bryson'):
+    return get_sampler(occurrence_model_name(ocrMeasurement)).draw(nselect)
@@ -0,0 +1,112 @@
+import numpy as np
+
+from sector_coverage import atomic_save
+
+# default period-radius grid for yield histograms: log bins from 0.5 to 1000
+# days and from 0.5 to 32 earth radii
+PERIOD_BINS = np.logspace(np.log10(0.5), np.log10(1000.), 23)
+RADIUS_BINS = np.logspace(np.log10(0.5), np.log10(32.), 19)
+
+
+def _select(dfw, columns):
+    """
+    rows of dfw with every one of the boolean columns set
+    """
+    mask = np.ones(dfw.shape[0], dtype=bool)
+    for column in columns:
+        mask &= dfw[column].values.astype(bool)
+    return mask
+
+
+class CountReduction(object):
+    """
+    number of planets in each realization with all of the given boolean
+    columns set, e.g. CountReduction('detected', 'inZetaEarth')
+    """
+
+    shape = ()
+
+    def __init__(self, *columns):
+        self.columns = columns
+
+    def __call__(self, dfw, realization, nrealizations):
+        mask = _select(dfw, self.columns)
+        return np.bincount(realization[mask], minlength=nrealizations)
+
+
+class HistogramReduction(object):
+    """
+    2d histogram in each realization of xcolumn against ycolumn (by default
+    planetPeriod and planetRadius on PERIOD_BINS and RADIUS_BINS) of the
+    planets with all of the given boolean columns set. Bins include their
+    lower edge; planets outside the grid aren't counted.
+    """
+
+    def __init__(self, *columns, xcolumn='planetPeriod', ycolumn='planetRadius',
+                 xbins=PERIOD_BINS, ybins=RADIUS_BINS):
+        self.columns = columns
+        self.xcolumn = xcolumn
+        self.ycolumn = ycolumn
+        self.xbins = np.asarray(xbins)
+        self.ybins = np.asarray(ybins)
+        self.shape = (len(self.xbins) - 1, len(self.ybins) - 1)
+
+    def __call__(self, dfw, realization, nrealizations):
+        nx, ny = self.shape
+        ix = np.searchsorted(self.xbins, dfw[self.xcolumn].values, side='right') - 1
+        iy = np.searchsorted(self.ybins, dfw[self.ycolumn].values, side='right') - 1
+        mask = (_select(dfw, self.columns) & (ix >= 0) & (ix < nx) &
+                (iy >= 0) & (iy < ny))
+        cell = (realization[mask] * nx + ix[mask]) * ny + iy[mask]
+        counts = np.bincount(cell, minlength=nrealizations * nx * ny)
+        return counts.reshape((nrealizations,) + self.shape)
+
+
+class MonteCarloSummary(object):
+    """
+    Named reductions of the output of make_output_arr, accumulated
+    realization by realization into preallocated arrays, so a Monte Carlo
+    run can keep its yield distributions without writing or holding every
+    realization's planets.
+
+    reductions maps names to callables such as CountReduction, called as
+    reduction(dfw, realization, nrealizations) and returning an array of
+    shape (nrealizations,) + reduction.shape.
+    """
+
+    def __init__(self, reductions, nrealizations):
+        self.reductions = dict(reductions)
+        self.nrealizations = nrealizations
+        self.results = {
+            name: np.zeros((nrealizations,) + tuple(reduction.shape),
+                           dtype=np.int64)
+            for name, reduction in self.reductions.items()}
+
+    def reduce(self, dfw, nrealizations=1):
+        """
+        every reduction of dfw, the planets of nrealizations realizations
+        told apart by their 'realization' column (all 0 if there is none)
+        """
+        if 'realization' in dfw.columns:
+            realization = dfw['realization'].values.astype(np.int64)
+        else:
+            realization = np.zeros(dfw.shape[0], dtype=np.int64)
+        return {name: reduction(dfw, realization, nrealizations)
+                for name, reduction in self.reductions.items()}
+
+    def record(self, realizations, reduced):
+        """
+        store the output of reduce() as the given realization numbers
+        """
+        for name, values in reduced.items():
+            self.results[name][list(realizations)] = values
+
+    def add(self, dfw, realizations):
+        """
+        reduce dfw and store it as the given realization numbers
+        """
+        realizations = list(realizations)
+        self.record(realizations, self.reduce(dfw, len(realizations)))
+
+    def save(self, fn):
+        atomic_save(fn, lambda f: np.savez(f, **self.results))
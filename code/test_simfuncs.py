@@ -0,0 +1,20 @@
+import numpy as np
+import pytest
+
+import simfuncs
+
+
+def test_noise_array_kwargs_are_chunked_with_mag():
+    rng = np.random.default_rng(0)
+    mag = rng.uniform(4, 16, 2500)
+    readmod = rng.uniform(0.5, 2, 2500)
+    expected = simfuncs.TESS_NOISE.evaluate(mag, readmod=readmod, zodimod=1.5)
+    out = simfuncs.TESS_NOISE(mag, chunksize=1000, readmod=readmod,
+                              zodimod=1.5)
+    np.testing.assert_allclose(out, expected)
+
+
+def test_noise_model_needs_evaluate():
+    with pytest.raises(TypeError):
+        simfuncs.NoiseModel()
+
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+
+
+class MissionTimeline(object):
+    """
+    The observing windows of a mission, in days from the start of the
+    first, one per sector (or orbit, or Kepler quarter) in the order of the
+    bits of a SectorCoverage.
+
+    Window k is (start[k], end[k]], so a transit exactly on a boundary
+    belongs to the earlier window, as in count_transits. Windows needn't be
+    contiguous or equally long; nothing is observed in the gaps between
+    them, such as downlinks. The distinct window boundaries are kept once,
+    sorted, in edges, with istart and iend indexing them, so the number of
+    transits before each boundary is only worked out once.
+    """
+
+    def __init__(self, start, end):
+        start = np.asarray(start, dtype=float)
+        end = np.asarray(end, dtype=float)
+        if np.any(end < start) or np.any(start[1:] < end[:-1]):
+            raise ValueError("windows must be in order and not overlap")
+        self.start = start
+        self.end = end
+        self.edges, inverse = np.unique(np.r_[start, end], return_inverse=True)
+        self.istart = inverse[:len(start)]
+        self.iend = inverse[len(start):]
+        # back to back windows, where the count in each is a difference of
+        # neighbouring edges
+        self.contiguous = len(self.edges) == len(start) + 1
+
+    @classmethod
+    def regular(cls, nsectors, sectorlength=13.7, first_sector=0):
+        """
+        nsectors back to back windows of sectorlength days, the first
+        starting first_sector windows after time zero
+        """
+        edges = sectorlength * (np.arange(nsectors + 1) + first_sector)
+        return cls(edges[:-1], edges[1:])
+
+    @classmethod
+    def from_boresights(cls, fieldfile, downlink=0.):
+        """
+        the windows in the start and end dates of each row of a boresight
+        file (as read by get_camera_coords), in days from the first start.
+        The last downlink days of every window are taken off for the data
+        downlink at the end of each orbit.
+        """
+        camdf = pd.read_csv(fieldfile, sep=';', usecols=['start', 'end'])
+        start = pd.to_datetime(camdf['start'])
+        end = pd.to_datetime(camdf['end'])
+        t0 = start.iloc[0]
+        start = ((start - t0) / pd.Timedelta(days=1)).values
+        end = ((end - t0) / pd.Timedelta(days=1)).values - downlink
+        return cls(start, np.maximum(end, start))
+
+    def __len__(self):
+        return len(self.start)
+
+    def __eq__(self, other):
+        return (isinstance(other, MissionTimeline) and
+                np.array_equal(self.start, other.start) and
+                np.array_equal(self.end, other.end))
+
+    def __hash__(self):
+        return hash((self.start.tobytes(), self.end.tobytes()))
+
+    def head(self, nwindows):
+        """
+        the first nwindows windows, e.g. the primary mission
+        """
+        return MissionTimeline(self.start[:nwindows], self.end[:nwindows])
+
+    def window_of(self, times):
+        """
+        index of the window each of times falls in, or -1 if none
+        """
+        times = np.asarray(times, dtype=float)
+        k = np.searchsorted(self.end, times, side='left')
+        inside = k < len(self)
+        k = np.minimum(k, len(self) - 1)
+        inside &= times > self.start[k]
+        return np.where(inside, k, -1)
+
+    def transits(self, T0, period):
+        """
+        number of transits, at T0 + n * period for n >= 0, of each planet
+        in each window, as a float (planet x window) array. The number up
+        to time t is floor((t - T0) / period) + 1 (or zero), and the number
+        in a window the difference of that at its ends.
+        """
+        T0 = np.asarray(T0, dtype=float)
+        period = np.asarray(period, dtype=float)
+        nbefore = np.floor(
+            (self.edges[np.newaxis, :] - T0[:, np.newaxis]) / period[:, np.newaxis]
+        )
+        np.maximum(nbefore + 1, 0, out=nbefore)
+        if self.contiguous:
+            return np.diff(nbefore, axis=1)
+        return nbefore[:, self.iend] - nbefore[:, self.istart]